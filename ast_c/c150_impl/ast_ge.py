@@ -1,5 +1,8 @@
-from pycparser import parse_file as pf
-from pycparser import c_ast
+from ast_c.utils.parser import parse_tree, preload
+from ast_common.errors import TooManyNodesError
+from ast_common.lazy import LazyModule
+
+c_ast = LazyModule("pycparser.c_ast")
 
 
 def is_int(string):
@@ -85,16 +88,22 @@ def get_unary_operator(s):
 
 
 class ASTGenerator:
-    def __init__(self, tree):
+    def __init__(self, tree, max_nodes=None):
         self.tree = tree
         self._nodes = []
+        self.max_nodes = float("inf") if max_nodes is None else max_nodes
 
     def generate_ast(self):
         self._nodes = []
         self.traverse(self.tree)
+        # the nodes generated after the last check of traverse
+        if len(self._nodes) > self.max_nodes:
+            raise TooManyNodesError(self.max_nodes)
         return self._nodes
 
     def traverse(self, node):
+        if len(self._nodes) > self.max_nodes:
+            raise TooManyNodesError(self.max_nodes)
         pos = len(self._nodes)
         json_node = {"id": pos}
         self._nodes.append(json_node)
@@ -297,11 +306,6 @@ class ASTGenerator:
         return pos
 
 
-def parse_file(filename):
-    # ast = pf(filename, use_cpp=True, cpp_path='gcc')
-    ast = pf(filename, use_cpp=True, cpp_path='gcc', cpp_args=['-E', r'-I/Users/eduardo/PycharmProjects/TwoLevelGenericASTProject/ast_c/fake_libc_include'])
-    return ASTGenerator(ast).generate_ast()
-
-#
-# a = parse_file("/Users/eduardo/PycharmProjects/TwoLevelGenericASTProject/ast_c/bubble.c")
-# print(a)
\ No newline at end of file
+def parse_file(filename, max_nodes=None):
+    ast = parse_tree(filename)
+    return ASTGenerator(ast, max_nodes).generate_ast()
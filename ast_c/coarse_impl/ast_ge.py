@@ -1,5 +1,8 @@
-from pycparser import parse_file as pf
-from pycparser import c_ast
+from ast_c.utils.parser import parse_tree, preload
+from ast_common.errors import TooManyNodesError
+from ast_common.lazy import LazyModule
+
+c_ast = LazyModule("pycparser.c_ast")
 
 
 def is_int(string):
@@ -85,14 +88,18 @@ def get_unary_operator(s):
 
 
 class ASTGenerator:
-    def __init__(self, tree, filename):
+    def __init__(self, tree, filename, max_nodes=None):
         self.tree = tree
         self.filename = filename
         self._nodes = []
+        self.max_nodes = float("inf") if max_nodes is None else max_nodes
 
     def generate_ast(self):
         self._nodes = []
         self.traverse(self.tree)
+        # the nodes generated after the last check of traverse
+        if len(self._nodes) > self.max_nodes:
+            raise TooManyNodesError(self.max_nodes)
         return self._nodes
 
     def traverse_list(self, nodes_list, node_type):
@@ -110,6 +117,8 @@ class ASTGenerator:
         return pos
 
     def traverse(self, node):
+        if len(self._nodes) > self.max_nodes:
+            raise TooManyNodesError(self.max_nodes)
         # done
         if isinstance(node, c_ast.FileAST):
             pos = len(self._nodes)
@@ -560,10 +569,6 @@ class ASTGenerator:
         return
 
 
-def parse_file(filename):
-    # ast = pf(filename, use_cpp=True, cpp_path='gcc')
-    ast = pf(filename, use_cpp=True, cpp_path='gcc', cpp_args=['-E', r'-I/Users/eduardo/PycharmProjects/TwoLevelGenericASTProject/ast_c/fake_libc_include'])
-    return ASTGenerator(ast, filename).generate_ast()
-
-a = parse_file("/Users/eduardo/PycharmProjects/TwoLevelGenericASTProject/ast_c/bubble.c")
-print(a)
\ No newline at end of file
+def parse_file(filename, max_nodes=None):
+    ast = parse_tree(filename)
+    return ASTGenerator(ast, filename, max_nodes).generate_ast()
@@ -0,0 +1,30 @@
+"""Parsing of C files with pycparser, shared by every C generator."""
+
+import os
+
+from ast_common.lazy import LazyModule
+
+pycparser = LazyModule("pycparser")
+
+# the headers of the repository standing for the C standard library, so
+# that files preprocess without the system headers pycparser cannot parse
+FAKE_LIBC_INCLUDE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                 "fake_libc_include")
+
+# the parser reused for every file, pycparser building its tables anew
+# otherwise
+_parser = None
+
+
+def preload():
+    """Imports pycparser and builds its parser, once before the workers are
+    forked so that they inherit it"""
+    global _parser
+    if _parser is None:
+        _parser = pycparser.CParser()
+    return _parser
+
+
+def parse_tree(filename):
+    return pycparser.parse_file(filename, use_cpp=True, cpp_path='gcc',
+                                cpp_args=['-E', '-I' + FAKE_LIBC_INCLUDE], parser=preload())
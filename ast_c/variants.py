@@ -0,0 +1,58 @@
+"""Generation of several C AST variants from a single preprocessing and
+parse of every file, see the `variants` option of `pipeline.process_files`.
+"""
+
+from ast_c.original_impl import ast_ge as original_ge
+from ast_c.fine_impl import ast_ge as fine_ge
+from ast_c.coarse_impl import ast_ge as coarse_ge
+from ast_c.c150_impl import ast_ge as c150_ge
+from ast_common import glob
+from ast_common import pipeline
+
+
+# functions `generator(tree, filename, max_nodes)` returning the
+# `ASTGenerator` of every variant
+GENERATORS = {
+    "original": lambda tree, filename, max_nodes: original_ge.ASTGenerator(tree, max_nodes),
+    "fine": lambda tree, filename, max_nodes: fine_ge.ASTGenerator(tree, filename, max_nodes),
+    "coarse": lambda tree, filename, max_nodes: coarse_ge.ASTGenerator(tree, filename, max_nodes),
+    "150": lambda tree, filename, max_nodes: c150_ge.ASTGenerator(tree, max_nodes),
+}
+
+
+def preload():
+    # every variant shares the parser of the original generator
+    original_ge.preload()
+
+
+def parse_file(filename, options):
+    """Returns the AST nodes of `filename` for every variant of
+    `options`["variants"], or the exception raised by its generator"""
+    tree = original_ge.parse_tree(filename)
+    asts = []
+    for variant in options["variants"]:
+        try:
+            asts.append(GENERATORS[variant](tree, filename, options.get("max_nodes")).generate_ast())
+        except Exception as e:  # pylint: disable=broad-except
+            asts.append(e)
+    return asts
+
+
+def process_files(files_pattern, output, variants, options=None):
+    """Process all the files matched with the `files_pattern` with all the
+    `variants` at once and output the results of every variant in
+    `output`_`variant`
+
+    Args:
+        files_pattern: a glob pattern containing c files, or tar and zip
+            archives of them with the `archive_members` option
+        output: the path to a file without extension where to output results
+        variants: names of variants among "original", "fine", "coarse"
+            and "150"
+    """
+    unknown = set(variants) - set(GENERATORS)
+    if unknown:
+        raise ValueError("unknown c variants: {0}".format(", ".join(sorted(unknown))))
+    files = glob.iglob(files_pattern, recursive=True)
+    options = dict(options or {}, generator=__name__, variants=list(variants), record_suffix=".c")
+    pipeline.process_files(files, output, parse_file, options)
@@ -0,0 +1,104 @@
+"""Reading of the source files directly from tar and zip archives.
+
+The members of an archive are read as a stream and sent with their content
+to the workers, nothing is extracted to disk. A member is named
+`archive!member` in the outputs, `archive` being the path of the archive as
+discovered. An archive that cannot be read is recorded as failed, after
+the members read before the error.
+"""
+
+import fnmatch
+import hashlib
+import logging
+import tarfile
+import zipfile
+import zlib
+
+from ast_common.manifest import file_digest
+
+
+ARCHIVE_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz", ".zip")
+
+# the errors of a truncated or corrupt archive
+ARCHIVE_ERRORS = (tarfile.TarError, zipfile.BadZipFile, zlib.error, EOFError, OSError)
+
+
+class SourceFile:
+    """A source file read from an archive, with its `name` and content
+    `data` as bytes"""
+    def __init__(self, name, data):
+        self.name = name
+        self.data = data
+
+    @property
+    def member(self):
+        return self.name.split("!", 1)[1]
+
+
+class ArchiveError(OSError):
+    pass
+
+
+class UnreadableArchive:
+    """An archive that could not be read because of `error`, sent to the
+    workers like a source file so that it is recorded as failed"""
+    def __init__(self, name, error):
+        self.name = name
+        self.error = error
+
+    @property
+    def member(self):
+        return self.name
+
+    @property
+    def data(self):
+        raise ArchiveError("unreadable archive: {0}".format(self.error))
+
+
+def source_name(source):
+    """Returns the name of `source`, a path or a file read from an archive or
+    a pack"""
+    return source if isinstance(source, str) else source.name
+
+
+def source_digest(source):
+    """Returns the SHA-1 of the content of `source`, a path or a file read
+    from an archive or a pack"""
+    if isinstance(source, str):
+        return file_digest(source)
+    return hashlib.sha1(source.data).hexdigest()
+
+
+def is_archive(filename):
+    return filename.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def read_archive(archive, pattern):
+    """Yields the regular members of `archive` whose name matches the
+    `fnmatch` pattern `pattern` as `SourceFile`s, in the order of the
+    archive"""
+    if archive.lower().endswith(".zip"):
+        with zipfile.ZipFile(archive) as f:
+            for info in f.infolist():
+                if not info.is_dir() and fnmatch.fnmatchcase(info.filename, pattern):
+                    yield SourceFile("{0}!{1}".format(archive, info.filename), f.read(info))
+        return
+    with tarfile.open(archive, "r|*") as f:
+        for info in f:
+            if info.isfile() and fnmatch.fnmatchcase(info.name, pattern):
+                yield SourceFile("{0}!{1}".format(archive, info.name), f.extractfile(info).read())
+
+
+def expand_archives(files, pattern):
+    """Yields the files of `files`, replacing the archives by their members
+    matching `pattern`, followed by an `UnreadableArchive` if an archive
+    could not be read until its end"""
+    for filename in files:
+        if not is_archive(filename):
+            yield filename
+            continue
+        try:
+            yield from read_archive(filename, pattern)
+        except ARCHIVE_ERRORS as e:
+            logging.warning("failed to read the archive %s: %s", filename, e)
+            yield UnreadableArchive(filename, e)
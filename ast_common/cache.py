@@ -0,0 +1,106 @@
+"""Content-addressed on-disk cache of generated ASTs.
+
+An entry is keyed by the hash of the source bytes and of the generator
+variant (the generator module and the options changing its ASTs), so that
+a source appearing under many paths is only parsed once. Entries are files
+`<cache_dir>/<2 hex digits>/<38 hex digits>` holding the number of nodes
+on a first line followed by the JSON encoded list of nodes.
+"""
+
+import hashlib
+import json
+import logging
+import os
+
+
+# the options changing the ASTs generated from a source
+GENERATOR_OPTIONS = ("generator", "normalize", "wrap_class")
+
+
+def cache_variant(options):
+    return json.dumps({key: options.get(key) for key in GENERATOR_OPTIONS},
+                      sort_keys=True, separators=(",", ":"))
+
+
+class ASTCache:
+    """The cache in `directory` for the generator variant of `options`,
+    holding at most `max_bytes` once evicted"""
+    def __init__(self, directory, options, max_bytes):
+        self.directory = directory
+        self.variant = cache_variant(options).encode("utf-8")
+        self.max_bytes = max_bytes
+        self.written = 0
+
+    def path(self, digest):
+        key = hashlib.sha1(self.variant + b"\0" + digest.encode("ascii")).hexdigest()
+        return os.path.join(self.directory, key[:2], key[2:])
+
+    def get(self, digest):
+        """Returns the number of nodes and the encoded AST of the source
+        whose SHA-1 is `digest`, or None if it is not cached"""
+        path = self.path(digest)
+        try:
+            with open(path, "rb") as f:
+                node_count = int(f.readline())
+                encoded_ast = f.read()
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return node_count, encoded_ast
+
+    def put(self, digest, node_count, encoded_ast):
+        """Caches the AST of the source whose SHA-1 is `digest` and returns
+        the number of bytes written"""
+        path = self.path(digest)
+        tmp = "{0}.{1}.tmp".format(path, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp, "wb") as f:
+                f.write(b"%d\n" % node_count)
+                f.write(encoded_ast)
+            os.replace(tmp, path)
+        except OSError as e:
+            logging.debug("failed to cache %s: %s", path, e)
+            return 0
+        return len(encoded_ast)
+
+    def record(self, size):
+        """Records `size` bytes written to the cache by a worker, evicting
+        every tenth of `max_bytes` written so that the cache stays bounded
+        during a long run"""
+        self.written += size
+        if self.written >= self.max_bytes / 10:
+            self.evict()
+            self.written = 0
+
+    def evict(self):
+        """Removes the least recently used entries until the cache holds at
+        most `max_bytes`, entries being touched when they are read"""
+        entries = []
+        total = 0
+        if not os.path.isdir(self.directory):
+            return
+        for subdir in os.scandir(self.directory):
+            if not subdir.is_dir():
+                continue
+            for entry in os.scandir(subdir.path):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        evicted = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+        logging.info("evicted %s entries from the AST cache", evicted)
@@ -0,0 +1,181 @@
+"""Command line interface of the AST extraction, for every language and
+generator variant.
+
+Usage:
+    python -m ast_common.cli --lang py --variant fine --input "data/**/*.py" --output out/py_fine
+    python -m ast_common.cli --lang c --variant original,fine,coarse,150 --input "data/**/*.c" --output out/c
+    python -m ast_common.cli --lang c,py,java --variant c=fine,py=fine,java=150 --input "repo/**/*" --output out/repo
+    python -m ast_common.cli --lang c --variant coarse --jsonl - < records.jsonl > asts.jsonl
+
+See `python -m ast_common.cli --help` for all the options, which map to the
+options of `pipeline.process_files`.
+"""
+
+import argparse
+import importlib
+import logging
+import sys
+
+from ast_common import mixed
+from ast_common.compression import CODECS
+from ast_common.pool import WorkerInitError
+
+
+GENERATORS = {
+    ("c", "original"): "ast_c.original_impl.run",
+    ("c", "fine"): "ast_c.fine_impl.run",
+    ("c", "coarse"): "ast_c.coarse_impl.run",
+    ("c", "150"): "ast_c.c150_impl.run",
+    ("py", "original"): "ast_py.original_impl.run",
+    ("py", "fine"): "ast_py.fine_impl.run",
+    ("py", "coarse"): "ast_py.coarse_impl.run",
+    ("py", "150"): "ast_py.py150_impl.py_ast",
+    ("java", "150"): "ast_java.py150_impl.run",
+}
+
+# the modules generating several variants from a single parse
+MULTI_VARIANT_GENERATORS = {
+    "c": "ast_c.variants",
+    "py": "ast_py.variants",
+}
+
+LANGUAGES = ["c", "py", "java"]
+
+VARIANTS = ["original", "fine", "coarse", "150"]
+
+# (flag, option, type, help) of the options passed as is to the pipeline,
+# flags without a type being booleans
+PIPELINE_OPTIONS = [
+    ("--min-nodes", "min_nodes", int, "minimum number of nodes of an AST"),
+    ("--max-nodes", "max_nodes", int, "maximum number of nodes of an AST"),
+    ("--normalize", "normalize", None, "normalize the python ASTs"),
+    ("--wrap-class", "wrap_class", None, "parse java files containing a single method"),
+    ("--workers", "workers", int, "number of worker processes, defaults to the number of CPUs"),
+    ("--batch-size", "batch_size", int, "number of files sent at once to a worker"),
+    ("--stream", "stream", None, "process the files while discovering them"),
+    ("--max-pending", "max_pending", int, "in stream mode, maximum number of files waiting"),
+    ("--timeout", "timeout", float, "maximum number of seconds spent on a file"),
+    ("--max-tasks-per-worker", "max_tasks_per_worker", int, "number of files after which a worker is replaced"),
+    ("--max-worker-memory", "max_worker_memory", int, "resident memory in MB past which a worker is replaced"),
+    ("--schedule", "schedule", str, "'size' for longest first, 'adaptive' for adaptive chunk sizes"),
+    ("--target-chunk-seconds", "target_chunk_seconds", float, "duration of a chunk with the adaptive schedule"),
+    ("--ordered", "ordered", None, "write the results in the order of the files"),
+    ("--reorder-buffer", "reorder_buffer", int, "in ordered mode, size in MB of the buffered results"),
+    ("--checkpoint-interval", "checkpoint_interval", float, "seconds between checkpoints, 0 disables them"),
+    ("--resume", "resume", None, "resume an interrupted run from its last checkpoint"),
+    ("--incremental", "incremental", None, "only process the files changed since the previous run"),
+    ("--cache-dir", "cache_dir", str, "directory of the content-addressed AST cache"),
+    ("--cache-size", "cache_size", int, "maximum size in MB of the AST cache"),
+    ("--dedup", "dedup", None, "only process the first of the files with the same content"),
+    ("--dedup-asts", "dedup_asts", None, "only write the first of the identical ASTs"),
+    ("--shards", "shards", int, "number of output shards written in parallel"),
+    ("--partition", "partition", str, "only process the partition i/N of the files"),
+    ("--compression", "compression", str, "codec compressing the .json output, such as gzip"),
+    ("--archive-members", "archive_members", str, "pattern of the members of the tar and zip inputs"),
+]
+
+# the values accepted by the pipeline options having a fixed set of values
+CHOICES = {
+    "schedule": ["size", "adaptive"],
+    "compression": sorted(CODECS),
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Extract the ASTs of source files")
+    parser.add_argument("--lang", required=True,
+                        help="language among {0}, or several of them separated by commas to process "
+                             "every file with the language of its extension and output every language "
+                             "to OUTPUT_LANG".format(", ".join(LANGUAGES)))
+    parser.add_argument("--variant", required=True,
+                        help="generator variant among {0}, or several of them separated by commas to "
+                             "parse every file once and output every variant to OUTPUT_VARIANT, or "
+                             "LANG=VARIANT pairs separated by commas for several languages".format(
+                                 ", ".join(VARIANTS)))
+    parser.add_argument("--input", help="recursive glob pattern of the files to process")
+    parser.add_argument("--output", help="path without extension of the outputs")
+    parser.add_argument("--jsonl", metavar="FILE",
+                        help="process the source records of this JSON lines file, - for stdin, "
+                             "writing the results to stdout")
+    parser.add_argument("--log-level", default="INFO", help="logging level, logs are written to stderr")
+    for flag, option, type_, help_ in PIPELINE_OPTIONS:
+        if type_ is None:
+            parser.add_argument(flag, dest=option, action="store_true", default=None, help=help_)
+        else:
+            parser.add_argument(flag, dest=option, type=type_, choices=CHOICES.get(option), help=help_)
+    args = parser.parse_args(argv)
+    args.languages = args.lang.split(",")
+    if len(set(args.languages)) != len(args.languages):
+        parser.error("duplicate languages in {0}".format(args.lang))
+    for language in args.languages:
+        if language not in LANGUAGES:
+            parser.error("unknown language {0}".format(language))
+    if "=" in args.variant:
+        try:
+            pairs = [pair.split("=", 1) for pair in args.variant.split(",")]
+            variants = dict(pairs)
+        except ValueError:
+            parser.error("invalid variants {0}, expected LANG=VARIANT pairs".format(args.variant))
+        if len(variants) != len(pairs):
+            parser.error("several variants for a language in {0}".format(args.variant))
+        if set(variants) != set(args.languages):
+            parser.error("expected a variant for every language of --lang")
+        args.variants = None
+    else:
+        args.variants = args.variant.split(",")
+        if len(set(args.variants)) != len(args.variants):
+            parser.error("duplicate variants in {0}".format(args.variant))
+        variants = {language: args.variants[0] for language in args.languages}
+        if len(args.variants) > 1 and len(args.languages) > 1:
+            parser.error("several variants can only be produced for a single language")
+    for language, variant in variants.items():
+        if (language, variant) not in GENERATORS:
+            parser.error("there is no {0} variant for {1}".format(variant, language))
+    args.generators = {language: GENERATORS[language, variant] for language, variant in variants.items()}
+    if args.variants and len(args.variants) > 1:
+        for variant in args.variants:
+            if (args.lang, variant) not in GENERATORS:
+                parser.error("there is no {0} variant for {1}".format(variant, args.lang))
+        if args.lang not in MULTI_VARIANT_GENERATORS:
+            parser.error("there is a single variant for {0}".format(args.lang))
+    if args.jsonl is not None and (len(args.generators) > 1 or (args.variants and len(args.variants) > 1)):
+        parser.error("--jsonl supports a single language and variant")
+    if args.jsonl is None and (args.input is None or args.output is None):
+        parser.error("--input and --output are required unless --jsonl is given")
+    if args.jsonl is not None and args.input is not None:
+        parser.error("--input cannot be combined with --jsonl")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper())
+    try:
+        run(args)
+    except WorkerInitError as e:
+        # typically a missing parser, which every worker would fail on
+        sys.exit("error: {0}".format(e))
+
+
+def run(args):
+    options = {option: getattr(args, option) for _, option, _, _ in PIPELINE_OPTIONS
+               if getattr(args, option) is not None}
+    if len(args.generators) > 1:
+        mixed.process_files(args.input, args.output, args.generators, options)
+        return
+    if args.variants and len(args.variants) > 1:
+        generator = importlib.import_module(MULTI_VARIANT_GENERATORS[args.lang])
+        generator.process_files(args.input, args.output, args.variants, options)
+        return
+    generator = importlib.import_module(args.generators[args.lang])
+    if args.jsonl is None:
+        generator.process_files(args.input, args.output, options)
+    elif args.jsonl == "-":
+        generator.process_records(sys.stdin.buffer, sys.stdout.buffer, options)
+    else:
+        with open(args.jsonl, "rb") as records:
+            generator.process_records(records, sys.stdout.buffer, options)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Compression of the `output`.json files of the pipeline.
+
+The ASTs are compressed by blocks, every block being a complete stream of
+the codec (a gzip member, a bz2 or xz stream, a zstd frame), so that the
+blocks can be compressed in parallel threads while the concatenation
+remains a valid file for the usual tools (`zcat`, `gzip.open`, ...), which
+decompress it as a stream.
+"""
+
+import bz2
+import gzip
+import io
+import lzma
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Codec:
+    """A compression format, `compress(data)` returning a complete stream
+    and `open_reader(path)` a binary file decompressing the concatenated
+    streams of `path`"""
+    def __init__(self, suffix, compress, open_reader):
+        self.suffix = suffix
+        self.compress = compress
+        self.open_reader = open_reader
+
+
+CODECS = {
+    "gzip": Codec(".gz", lambda data: gzip.compress(data, 6, mtime=0), lambda path: gzip.open(path, "rb")),
+    "bz2": Codec(".bz2", bz2.compress, lambda path: bz2.open(path, "rb")),
+    "xz": Codec(".xz", lzma.compress, lambda path: lzma.open(path, "rb")),
+}
+
+try:
+    import zstandard
+except ImportError:
+    pass
+else:
+    def open_zstd(path):
+        reader = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), read_across_frames=True)
+        return io.BufferedReader(reader)
+
+    CODECS["zstd"] = Codec(".zst", lambda data: zstandard.ZstdCompressor().compress(data), open_zstd)
+
+
+def get_codec(compression):
+    try:
+        return CODECS[compression]
+    except KeyError:
+        raise ValueError("unknown compression {0}, expected one of {1}".format(
+            compression, ", ".join(sorted(CODECS)))) from None
+
+
+class BlockWriter:
+    """A binary file writing to the file `f` what is written to it,
+    compressed with `codec` by blocks of `block_size` bytes in `threads`
+    threads. Flushing it ends the current block, so that the size of `f`
+    is then the end of a complete stream."""
+    def __init__(self, f, codec, block_size=1 << 20, threads=None):
+        self.file = f
+        self.codec = codec
+        self.block_size = block_size
+        self.threads = threads or os.cpu_count() or 1
+        self.executor = ThreadPoolExecutor(self.threads)
+        self.buffer = []
+        self.buffered_bytes = 0
+        self.pending = deque()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, data):
+        self.buffer.append(data)
+        self.buffered_bytes += len(data)
+        if self.buffered_bytes >= self.block_size:
+            self.submit()
+        return len(data)
+
+    def submit(self):
+        if self.buffer:
+            self.pending.append(self.executor.submit(self.codec.compress, b"".join(self.buffer)))
+            self.buffer = []
+            self.buffered_bytes = 0
+        while self.pending and (self.pending[0].done() or len(self.pending) > 2 * self.threads):
+            self.file.write(self.pending.popleft().result())
+
+    def flush(self):
+        self.submit()
+        while self.pending:
+            self.file.write(self.pending.popleft().result())
+        self.file.flush()
+
+    def tell(self):
+        return self.file.tell()
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.flush()
+        self.executor.shutdown()
+        self.file.close()
+
+
+def output_paths(path):
+    """Returns the paths of `path` uncompressed and compressed with every
+    codec"""
+    return [path] + [path + codec.suffix for codec in CODECS.values()]
+
+
+def open_output(path, mode, compression=None):
+    """Opens the binary output `path`, compressed with `compression` to
+    `path` followed by the suffix of the codec if given. When overwriting
+    it, its versions in other formats are removed."""
+    codec = get_codec(compression) if compression is not None else None
+    target = path + codec.suffix if codec is not None else path
+    if "w" in mode:
+        for other in output_paths(path):
+            if other != target and os.path.exists(other):
+                os.remove(other)
+    if codec is None:
+        return open(target, mode)
+    return BlockWriter(open(target, mode), codec)
+
+
+def open_input(path):
+    """Opens the binary output `path`, or its compressed version if it only
+    exists compressed"""
+    if not os.path.exists(path):
+        for codec in CODECS.values():
+            if os.path.exists(path + codec.suffix):
+                return codec.open_reader(path + codec.suffix)
+    return open(path, "rb")
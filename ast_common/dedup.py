@@ -0,0 +1,122 @@
+"""Deduplication of the input files by the hash of their content, and of
+the output ASTs by the hash of their encoding.
+
+With `Deduplicator`, only the first file with a given content (its
+canonical file) is processed and has a record in the outputs. Every other
+file is recorded in `output`_duplicates.txt as a line
+`path<TAB>canonical path`, and every canonical file having duplicates in
+`output`_multiplicity.txt as a line
+`canonical path<TAB>number of files with its content`. The files are
+hashed by a pool of threads, in parallel with their discovery and parsing,
+while their order decides which one is canonical.
+
+With `TreeIndex`, every distinct AST is only written once to `output`.json,
+along with the first file it was generated from in `output`.txt. Every
+successfully processed file is recorded in `output`_trees.txt as a line
+`path<TAB>line of its AST in output.json` (starting at 0), and the line i
+of `output`_tree_counts.txt is the number of files with the AST i.
+"""
+
+import hashlib
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from ast_common.archive import source_digest, source_name
+
+
+def safe_digest(source):
+    """Returns the SHA-1 of the content of `source`, or None if it cannot be
+    read"""
+    try:
+        return source_digest(source)
+    except OSError:
+        return None
+
+
+def hash_files(files, threads):
+    """Yields the `(source, digest)` pairs of `files` in order, hashing up to
+    `4 * threads` files ahead in `threads` threads"""
+    with ThreadPoolExecutor(threads) as executor:
+        pending = deque()
+        for source in files:
+            pending.append((source, executor.submit(safe_digest, source)))
+            if len(pending) >= 4 * threads:
+                source, digest = pending.popleft()
+                yield source, digest.result()
+        while pending:
+            source, digest = pending.popleft()
+            yield source, digest.result()
+
+
+class Deduplicator:
+    """Filters the duplicates out of the files of a run into `output`,
+    hashing them in `threads` threads"""
+    def __init__(self, output, threads=16):
+        self.output = output
+        self.threads = threads
+        self.canonical = {}
+        self.duplicate_count = 0
+        self.duplicates = open(output + "_duplicates.txt", "wb")
+
+    def close(self):
+        """Closes `output`_duplicates.txt and writes
+        `output`_multiplicity.txt, once all the files were iterated"""
+        self.duplicates.close()
+        with open(self.output + "_multiplicity.txt", "wb") as f:
+            for filename, count in self.canonical.values():
+                if count > 1:
+                    f.write("{0}\t{1}\n".format(filename, count).encode("utf-8"))
+        logging.info("skipped %s duplicates of %s unique files", self.duplicate_count, len(self.canonical))
+
+    def unique_files(self, files):
+        """Yields the files of `files` whose content was not seen yet,
+        recording the other ones as duplicates. Unreadable files are
+        yielded so that they are recorded as failed."""
+        for source, digest in hash_files(files, self.threads):
+            if digest is None:
+                yield source
+                continue
+            filename = source_name(source)
+            entry = self.canonical.get(digest)
+            if entry is None:
+                self.canonical[digest] = [filename, 1]
+                yield source
+                continue
+            entry[1] += 1
+            self.duplicate_count += 1
+            self.duplicates.write("{0}\t{1}\n".format(filename, entry[0]).encode("utf-8"))
+
+
+def tree_digest(encoded_ast):
+    return hashlib.sha1(encoded_ast).digest()
+
+
+class TreeIndex:
+    """Index of the distinct ASTs written to `output`"""
+    def __init__(self, output):
+        self.output = output
+        self.trees = {}
+        self.counts = []
+        self.index = open(output + "_trees.txt", "wb")
+
+    def add(self, item):
+        """Records the successfully processed `item` and returns whether its
+        AST is a new one, which has to be written"""
+        digest = item.tree_digest or tree_digest(item.ast)
+        tree = self.trees.get(digest)
+        new = tree is None
+        if new:
+            tree = self.trees[digest] = len(self.counts)
+            self.counts.append(0)
+        self.counts[tree] += 1
+        self.index.write(item.line[:-1] + "\t{0}\n".format(tree).encode("utf-8"))
+        return new
+
+    def close(self):
+        """Closes `output`_trees.txt and writes `output`_tree_counts.txt"""
+        self.index.close()
+        with open(self.output + "_tree_counts.txt", "wb") as f:
+            for count in self.counts:
+                f.write(b"%d\n" % count)
+        logging.info("wrote %s distinct ASTs of %s files", len(self.counts), sum(self.counts))
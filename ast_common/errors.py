@@ -0,0 +1,7 @@
+class TooManyNodesError(Exception):
+    """Raised by an `ASTGenerator` as soon as it generated more nodes than
+    its `max_nodes` budget, so huge files are rejected without building
+    their whole list of nodes"""
+    def __init__(self, max_nodes):
+        super().__init__("too many nodes")
+        self.max_nodes = max_nodes
@@ -81,14 +81,16 @@ def _iglob(pathname, recursive, dironly):
             yield os.path.join(dirname, name)
 
 # These 2 helper functions non-recursively glob inside a literal directory.
-# They return a list of basenames.  _glob1 accepts a pattern while _glob0
+# They return an iterable of basenames.  _glob1 accepts a pattern while _glob0
 # takes a literal basename (so it only has to check for its existence).
+# Unlike the Python 3.6 version, _glob1 is lazy so that huge flat directories
+# are streamed instead of being listed in memory first.
 
 def _glob1(dirname, pattern, dironly):
-    names = list(_iterdir(dirname, dironly))
+    names = _iterdir(dirname, dironly)
     if not _ishidden(pattern):
         names = (x for x in names if not _ishidden(x))
-    return fnmatch.filter(names, pattern)
+    return (x for x in names if fnmatch.fnmatch(x, pattern))
 
 def _glob0(dirname, basename, dironly):
     if not basename:
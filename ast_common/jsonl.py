@@ -0,0 +1,60 @@
+"""Streaming of source records as JSON lines, to use the extractors in shell
+pipelines without temporary files.
+
+Every input line is a record `{"id": ..., "code": "..."}`. Every output line
+is a record `{"id": ..., "ast": [...]}`, or `{"id": ..., "error": "..."}` for
+a source that could not be processed, written as soon as it is processed,
+hence not in the order of the input. The ids are any JSON value, copied
+as is.
+"""
+
+import json
+import logging
+
+
+class SourceRecord:
+    """The source `code` of a record, with the extension `suffix` of the
+    temporary file it is written to for parsers needing a path"""
+    def __init__(self, id, code, suffix):
+        self.id = id
+        self.name = "record {0}".format(json.dumps(id))
+        self.data = code.encode("utf-8")
+        self.member = "record" + suffix
+
+
+def read_records(records, suffix):
+    """Yields the `SourceRecord`s of the binary file `records`, skipping the
+    invalid lines"""
+    for line_number, line in enumerate(records, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            yield SourceRecord(record["id"], record["code"], suffix)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            logging.warning("skipping invalid record on line %s: %s", line_number, e)
+
+
+class RecordWriter:
+    """Writes the processed records to the binary file `out`"""
+    def __init__(self, out):
+        self.out = out
+        self.ids = {}
+        self.success_count = 0
+        self.failure_count = 0
+
+    def track(self, tasks):
+        """Yields the `(index, record)` tasks, remembering the id of every
+        record until its result is written"""
+        for index, record in tasks:
+            self.ids[index] = record.id
+            yield index, record
+
+    def write(self, item):
+        record_id = json.dumps(self.ids.pop(item.index)).encode("utf-8")
+        if item.success:
+            self.out.write(b'{"id": ' + record_id + b', "ast": ' + item.ast.rstrip(b"\n") + b"}\n")
+            self.success_count += 1
+        else:
+            self.out.write(b'{"id": ' + record_id + b', "error": ' + json.dumps(item.reason).encode("utf-8") + b"}\n")
+            self.failure_count += 1
@@ -0,0 +1,24 @@
+"""Lazy imports of the parsers, so that importing a generator neither fails
+without its parser nor pays for loading it until a file is parsed.
+"""
+
+import importlib
+
+
+class LazyModule:
+    """Proxy of the module `name`, imported on the first access to one of
+    its attributes, which are then cached on the proxy"""
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def load(self):
+        """Imports the module if needed and returns it"""
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attribute):
+        value = getattr(self.load(), attribute)
+        setattr(self, attribute, value)
+        return value
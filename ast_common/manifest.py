@@ -0,0 +1,117 @@
+"""Manifest of the files extracted into an output, used to only process
+the files that are new or changed since the previous run.
+
+The manifest `output`.manifest has one line per input file with its
+path, size, modification time in nanoseconds, SHA-1 of its content and the
+generator variant it was extracted with, separated by tabs.
+"""
+
+import hashlib
+import json
+import logging
+import os
+
+from ast_common.cache import GENERATOR_OPTIONS
+from ast_common.writer import OUTPUT_SUFFIXES
+
+
+def variant_key(options):
+    """Returns a string identifying the generator and the options changing
+    its output, files extracted with another variant are processed again"""
+    return json.dumps({key: options.get(key) for key in GENERATOR_OPTIONS + ("min_nodes", "max_nodes")},
+                      sort_keys=True, separators=(",", ":"))
+
+
+def file_digest(filename):
+    h = hashlib.sha1()
+    with open(filename, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class Manifest:
+    """The manifest of `output`, for the generator variant `variant`"""
+    def __init__(self, output, variant):
+        self.path = output + ".manifest"
+        self.variant = variant
+        self.entries = {}
+        self.pending = {}
+        self.kept = set()
+        self.processed = set()
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                for line in f:
+                    path, size, mtime, digest, entry_variant = line.rstrip(b"\n").decode("utf-8").split("\t")
+                    self.entries[path] = (int(size), int(mtime), digest, entry_variant)
+
+    def changed_files(self, files):
+        """Yields the files of `files` that are not in the manifest or whose
+        size, modification time and content or variant changed, recording
+        the unchanged ones as kept"""
+        for filename in files:
+            if not isinstance(filename, str):
+                # read from a pack, without a modification time to compare
+                yield filename
+                continue
+            try:
+                stat = os.stat(filename)
+            except OSError:
+                yield filename
+                continue
+            entry = self.entries.get(filename)
+            if entry is not None and entry[3] == self.variant and entry[0] == stat.st_size:
+                if entry[1] == stat.st_mtime_ns or entry[2] == file_digest(filename):
+                    self.entries[filename] = (stat.st_size, stat.st_mtime_ns, entry[2], entry[3])
+                    self.kept.add(filename)
+                    continue
+            self.pending[filename] = (stat.st_size, stat.st_mtime_ns)
+            yield filename
+
+    def record(self, item):
+        """Records the processed `item`, whose digest was computed by the
+        worker that read the file"""
+        size, mtime = self.pending.pop(item.filename, (0, 0))
+        self.entries[item.filename] = (size, mtime, item.digest or "", self.variant)
+        self.processed.add(item.filename)
+
+    def merge(self, output, delta):
+        """Replaces the outputs of `output` by their records of the kept
+        files followed by the records of `delta`, then saves the manifest.
+        Records of the files that were changed or deleted are dropped."""
+        for suffix in OUTPUT_SUFFIXES.values():
+            if not os.path.exists(output + suffix):
+                open(output + suffix, "wb").close()
+        with open(output + ".json.tmp", "wb") as asts, \
+             open(output + ".txt.tmp", "wb") as files, \
+             open(output + "_failed.txt.tmp", "wb") as failed_files:
+            with open(output + ".json", "rb") as old_asts, open(output + ".txt", "rb") as old_files:
+                for ast_line, file_line in zip(old_asts, old_files):
+                    if file_line.rstrip(b"\n").decode("utf-8") in self.kept:
+                        asts.write(ast_line)
+                        files.write(file_line)
+            with open(output + "_failed.txt", "rb") as old_failed_files:
+                for line in old_failed_files:
+                    if line.split(b"\t", 1)[0].decode("utf-8") in self.kept:
+                        failed_files.write(line)
+            for f, suffix in ((asts, ".json"), (files, ".txt"), (failed_files, "_failed.txt")):
+                with open(delta + suffix, "rb") as delta_file:
+                    for block in iter(lambda: delta_file.read(1 << 20), b""):
+                        f.write(block)
+        for suffix in OUTPUT_SUFFIXES.values():
+            os.replace(output + suffix + ".tmp", output + suffix)
+            os.remove(delta + suffix)
+        if os.path.exists(delta + ".checkpoint"):
+            os.remove(delta + ".checkpoint")
+        self.save()
+
+    def save(self):
+        for filename in list(self.entries):
+            if filename not in self.kept and filename not in self.processed:
+                del self.entries[filename]
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            for path, (size, mtime, digest, variant) in self.entries.items():
+                f.write("{0}\t{1}\t{2}\t{3}\t{4}\n".format(path, size, mtime, digest, variant).encode("utf-8"))
+        os.replace(tmp, self.path)
+        logging.info("kept %s unchanged files, manifest has %s files", len(self.kept), len(self.entries))
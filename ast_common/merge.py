@@ -0,0 +1,192 @@
+"""Merge of several outputs of the pipeline, such as the shards of a run or
+the outputs of the partitions of a run, into a single output.
+
+Usage: python -m ast_common.merge [--sort] [--dedup] [--compression CODEC]
+                                  OUTPUT INPUT...
+
+An input with a shard manifest `input`.shards.json stands for all its
+shards, and compressed inputs are decompressed. The records are streamed,
+sorting them by path spills sorted runs to temporary files so that the
+memory stays bounded.
+"""
+
+import argparse
+import heapq
+import itertools
+import json
+import logging
+import os
+import pickle
+import tempfile
+
+from ast_common.compression import get_codec, open_input, open_output, output_paths
+from ast_common.writer import OUTPUT_SUFFIXES
+
+
+def expand_inputs(inputs):
+    """Yields the inputs, replacing the sharded ones by their shards, which
+    are next to their shard manifest"""
+    for prefix in inputs:
+        if os.path.exists(prefix + ".shards.json"):
+            with open(prefix + ".shards.json") as f:
+                for shard in json.load(f)["shards"]:
+                    yield os.path.join(os.path.dirname(prefix), os.path.basename(shard["output"]))
+        else:
+            yield prefix
+
+
+def count_lines(filename):
+    count = 0
+    with open_input(filename) as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            count += block.count(b"\n")
+    return count
+
+
+def validate_output(prefix):
+    """Returns the number of successfully processed files of the output
+    `prefix`, raising a ValueError if its .json and .txt files do not have
+    the same number of lines"""
+    ast_count = count_lines(prefix + ".json")
+    file_count = count_lines(prefix + ".txt")
+    if ast_count != file_count:
+        raise ValueError("{0}.json has {1} lines but {0}.txt has {2}".format(prefix, ast_count, file_count))
+    return ast_count
+
+
+# A record is a tuple (path, failed, AST line, file line), with the path and
+# lines as bytes and the AST line None for failed files, which sorts the
+# successful record of a path first.
+
+def read_successes(prefix):
+    with open_input(prefix + ".json") as asts, open(prefix + ".txt", "rb") as files:
+        for ast_line, file_line in zip(asts, files):
+            yield file_line.rstrip(b"\n"), False, ast_line, file_line
+
+
+def read_failures(prefix):
+    with open(prefix + "_failed.txt", "rb") as failed_files:
+        for line in failed_files:
+            yield line.split(b"\t", 1)[0], True, None, line
+
+
+def record_key(record):
+    return record[0], record[1]
+
+
+def write_run(records, directory):
+    records.sort(key=record_key)
+    fd, path = tempfile.mkstemp(dir=directory, suffix=".run")
+    with os.fdopen(fd, "wb") as f:
+        for record in records:
+            pickle.dump(record, f, pickle.HIGHEST_PROTOCOL)
+    return path
+
+
+def read_run(path):
+    with open(path, "rb") as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                break
+
+
+def sort_records(records, max_bytes, directory):
+    """Returns an iterator over the `records` sorted by path, spilling sorted
+    runs of `max_bytes` of lines to `directory` and merging them"""
+    runs = []
+    run = []
+    run_bytes = 0
+    for record in records:
+        run.append(record)
+        run_bytes += len(record[3]) + len(record[2] or b"")
+        if run_bytes >= max_bytes:
+            runs.append(write_run(run, directory))
+            run = []
+            run_bytes = 0
+    if not runs:
+        run.sort(key=record_key)
+        return iter(run)
+    if run:
+        runs.append(write_run(run, directory))
+    logging.info("merging %s sorted runs", len(runs))
+    return heapq.merge(*(read_run(path) for path in runs), key=record_key)
+
+
+def merge_outputs(output, inputs, sort=False, dedup=False, max_memory=256, compression=None):
+    """Merges the outputs `inputs` into `output`
+
+    Args:
+        output: the path without extension of the merged output, which
+            may be one of the inputs
+        inputs: the paths without extension of the outputs to merge
+        sort: sort the records by path instead of keeping them in the
+            order of the inputs
+        dedup: only keep the first record of every path, a successful
+            record taking precedence over a failed one. Without `sort`,
+            the set of paths is kept in memory.
+        max_memory: the size in MB of the records sorted in memory
+        compression: the codec compressing `output`.json, if any
+    """
+    inputs = list(expand_inputs(inputs))
+    total = sum(validate_output(prefix) for prefix in inputs)
+    logging.info("merging %s inputs with %s successfully processed files", len(inputs), total)
+    records = itertools.chain(*[read_successes(prefix) for prefix in inputs],
+                              *[read_failures(prefix) for prefix in inputs])
+    success_count = 0
+    failure_count = 0
+    duplicate_count = 0
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(output))) as directory:
+        if sort:
+            records = sort_records(records, max_memory * 1024 * 1024, directory)
+        tmp = os.path.join(directory, "merged")
+        with open_output(tmp + ".json", "wb", compression) as asts, \
+             open(tmp + ".txt", "wb") as files, \
+             open(tmp + "_failed.txt", "wb") as failed_files:
+            seen = set()
+            previous = None
+            for path, failed, ast_line, line in records:
+                if dedup:
+                    if path == previous or path in seen:
+                        duplicate_count += 1
+                        continue
+                    if sort:
+                        previous = path
+                    else:
+                        seen.add(path)
+                if failed:
+                    failed_files.write(line)
+                    failure_count += 1
+                else:
+                    asts.write(ast_line)
+                    files.write(line)
+                    success_count += 1
+        json_suffix = ".json" + (get_codec(compression).suffix if compression else "")
+        for path in output_paths(output + ".json"):
+            if os.path.exists(path):
+                os.remove(path)
+        os.replace(tmp + json_suffix, output + json_suffix)
+        for suffix in (OUTPUT_SUFFIXES["txt"], OUTPUT_SUFFIXES["failed"]):
+            os.replace(tmp + suffix, output + suffix)
+    if dedup:
+        logging.info("dropped %s duplicate records", duplicate_count)
+    logging.info("merged %s successfully processed files and %s failed files", success_count, failure_count)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge outputs of the AST extraction into a single one")
+    parser.add_argument("output", help="path without extension of the merged output")
+    parser.add_argument("inputs", nargs="+", help="paths without extension of the outputs to merge")
+    parser.add_argument("--sort", action="store_true", help="sort the records by path")
+    parser.add_argument("--dedup", action="store_true", help="only keep the first record of every path")
+    parser.add_argument("--max-memory", type=int, default=256,
+                        help="size in MB of the records sorted in memory")
+    parser.add_argument("--compression", help="codec compressing the merged .json file")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    merge_outputs(args.output, args.inputs, args.sort, args.dedup, args.max_memory, args.compression)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Extraction of a corpus mixing languages in a single pool, every file
+being routed by its extension to the generator of its language, see the
+`routes` option of `pipeline.process_files`.
+"""
+
+import importlib
+
+from ast_common import glob
+from ast_common import pipeline
+
+
+EXTENSIONS = {".c": "c", ".py": "py", ".java": "java"}
+
+
+def parse_file(filename, options):
+    language = pipeline.route(filename, options["routes"])
+    generator = importlib.import_module(options["generators"][language])
+    return generator.parse_file(filename, options)
+
+
+def process_files(files_pattern, output, generators, options=None):
+    """Process all the files matched with the `files_pattern` whose
+    language has a generator and output the results of every language in
+    `output`_`language`
+
+    Args:
+        files_pattern: a glob pattern containing source files, or tar and
+            zip archives of them with the `archive_members` option
+        output: the path to a file without extension where to output results
+        generators: a dict mapping languages among "c", "py" and "java" to
+            the name of the `run` module of their generator, such as
+            "ast_py.fine_impl.run"
+    """
+    routes = {extension: language for extension, language in EXTENSIONS.items() if language in generators}
+    files = glob.iglob(files_pattern, recursive=True)
+    options = dict(options or {}, generator=__name__, generators=generators, routes=routes,
+                   preload=list(generators.values()))
+    pipeline.process_files(files, output, parse_file, options)
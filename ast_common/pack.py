@@ -0,0 +1,111 @@
+"""Packs of source files, to avoid opening millions of tiny files.
+
+A pack `name`.pack holds the concatenated contents of the packed files, and
+its index `name`.pack.index has a line `offset<TAB>length<TAB>path` per file.
+The pipeline replaces the packs among the files to process by the files
+they contain, which workers read through a memory mapping of the pack.
+
+Usage: python -m ast_common.pack PACK PATTERN...
+"""
+
+import argparse
+import logging
+import mmap
+import os
+
+from ast_common import glob
+
+
+PACK_SUFFIX = ".pack"
+
+
+def write_pack(files, pack):
+    """Packs the `files` into `pack`, returning the number of files"""
+    count = 0
+    offset = 0
+    with open(pack + ".tmp", "wb") as data, open(pack + ".index.tmp", "wb") as index:
+        for filename in files:
+            try:
+                with open(filename, "rb") as f:
+                    content = f.read()
+            except OSError as e:
+                logging.warning("could not pack %s: %s", filename, e)
+                continue
+            data.write(content)
+            index.write("{0}\t{1}\t{2}\n".format(offset, len(content), filename).encode("utf-8"))
+            offset += len(content)
+            count += 1
+    os.replace(pack + ".tmp", pack)
+    os.replace(pack + ".index.tmp", pack + ".index")
+    logging.info("packed %s files of %s bytes into %s", count, offset, pack)
+    return count
+
+
+_maps = {}
+
+
+def map_pack(pack):
+    """Returns a memory mapping of `pack`, shared by all its files in the
+    current process"""
+    data = _maps.get(pack)
+    if data is None:
+        with open(pack, "rb") as f:
+            data = _maps[pack] = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    return data
+
+
+class PackedFile:
+    """A file of a pack, named by its original path. Its `data` is a slice
+    of the memory mapping of the pack, only its position is pickled."""
+    def __init__(self, name, pack, offset, length):
+        self.name = name
+        self.pack = pack
+        self.offset = offset
+        self.length = length
+
+    @property
+    def member(self):
+        return self.name
+
+    @property
+    def data(self):
+        if not self.length:
+            return b""
+        return map_pack(self.pack)[self.offset:self.offset + self.length]
+
+
+def is_pack(filename):
+    return filename.endswith(PACK_SUFFIX) and os.path.exists(filename + ".index")
+
+
+def read_pack(pack):
+    """Yields the files of `pack` as `PackedFile`s"""
+    with open(pack + ".index", "rb") as index:
+        for line in index:
+            offset, length, name = line.rstrip(b"\n").decode("utf-8").split("\t", 2)
+            yield PackedFile(name, pack, int(offset), int(length))
+
+
+def expand_packs(files):
+    """Yields the files of `files`, replacing the packs by their files"""
+    for filename in files:
+        if isinstance(filename, str) and is_pack(filename):
+            yield from read_pack(filename)
+        else:
+            yield filename
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack source files into a single file with an index")
+    parser.add_argument("pack", help="path of the pack, ending with " + PACK_SUFFIX)
+    parser.add_argument("patterns", nargs="+", help="recursive glob patterns of the files to pack")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if not args.pack.endswith(PACK_SUFFIX):
+        parser.error("the pack must end with " + PACK_SUFFIX)
+    files = (filename for pattern in args.patterns for filename in glob.iglob(pattern, recursive=True))
+    write_pack(files, args.pack)
+
+
+if __name__ == "__main__":
+    main()
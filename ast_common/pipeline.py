@@ -0,0 +1,587 @@
+"""Multiprocessing pipeline shared by the `run.py` modules of every
+language and generator variant.
+"""
+
+import functools
+import hashlib
+import itertools
+import json
+import logging
+import math
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing import Value
+from ast_common.archive import expand_archives, source_digest, source_name
+from ast_common.cache import ASTCache
+from ast_common.dedup import Deduplicator, TreeIndex, tree_digest
+from ast_common.jsonl import RecordWriter, read_records
+from ast_common.manifest import Manifest, variant_key
+from ast_common.pack import expand_packs
+from ast_common.pool import WorkerPool, preload_modules
+from ast_common.shards import ShardedWriter
+from ast_common.writer import MultiWriter, ResultWriter, ReorderingWriter, RoutingWriter, resume_outputs
+from ast_common.queue_item import EncodedFileItem, FailedFileItem, ProcessedFileItem, SerializedItem
+
+
+def preload_parser(parse):
+    """Calls the `preload` function of the module of `parse`, if any, which
+    loads its parser before the first file"""
+    preload = getattr(sys.modules.get(parse.__module__), "preload", None)
+    if preload is not None:
+        preload()
+
+
+def process_file_init(parse, options, parse_source):
+    # a no-op for the workers inheriting the parser preloaded by the fork server
+    preload_parser(parse)
+    process_file.parse = parse
+    process_file.parse_source = parse_source
+    process_file.options = options
+    process_file.cache = None
+    if options.get("cache_dir"):
+        process_file.cache = ASTCache(options["cache_dir"], options, 0)
+
+
+def process_file(task):
+    """Parses the file of `task`, an `(index, source)` pair, and returns its
+    result already serialized, so that JSON encoding happens in the workers
+    rather than in the writer"""
+    index, source = task
+    filename = source_name(source)
+    logging.debug("processing file %s", filename)
+    options = process_file.options
+    if options.get("variants"):
+        return process_variants(index, source, filename, options)
+    cache = process_file.cache
+    digest = None
+    cache_bytes = 0
+    started = time.monotonic()
+    try:
+        if cache is not None or options.get("incremental", False):
+            digest = source_digest(source)
+        cached = cache.get(digest) if cache is not None else None
+        if cached is not None:
+            node_count, encoded_ast = cached
+            item = EncodedFileItem(filename, encoded_ast, node_count, options)
+        else:
+            ast = parse_source_file(source, options)
+            item = ProcessedFileItem(filename, ast, options)
+            if cache is not None:
+                cache_bytes = cache.put(digest, item.node_count, item.encode())
+    except Exception as e: # pylint: disable=broad-except
+        logging.debug("failed to parse %s: %s", filename, str(e))
+        item = FailedFileItem(filename, e)
+    item = SerializedItem(item, index)
+    item.digest = digest
+    item.cache_bytes = cache_bytes
+    item.seconds = time.monotonic() - started
+    if item.success and options.get("dedup_asts", False):
+        item.tree_digest = tree_digest(item.ast)
+    return item
+
+
+def process_variants(index, source, filename, options):
+    """Parses the file once for all the generator variants of
+    `options`["variants"] and returns the list of their serialized results"""
+    try:
+        asts = parse_source_file(source, options)
+    except Exception as e: # pylint: disable=broad-except
+        logging.debug("failed to parse %s: %s", filename, str(e))
+        asts = [e] * len(options["variants"])
+    items = []
+    for ast in asts:
+        if isinstance(ast, Exception):
+            item = FailedFileItem(filename, ast)
+        else:
+            item = ProcessedFileItem(filename, ast, options)
+        items.append(SerializedItem(item, index))
+    return items
+
+
+def parse_source_file(source, options):
+    """Parses `source`, a path or a file read from an archive or a pack, which
+    is written to a temporary file if there is no `parse_source` function"""
+    if isinstance(source, str):
+        return process_file.parse(source, options)
+    if process_file.parse_source is not None:
+        return process_file.parse_source(source.data, options)
+    with tempfile.NamedTemporaryFile(suffix=os.path.splitext(source.member)[1]) as f:
+        f.write(source.data)
+        f.flush()
+        try:
+            return process_file.parse(f.name, options)
+        except Exception as e:
+            # the reason of the failure names the source, not the temporary file
+            rename_error(e, f.name, source.name)
+            raise
+
+
+def rename_error(error, old, new):
+    """Replaces the path `old` by `new` in the message of `error`"""
+    error.args = tuple(arg.replace(old, new) if isinstance(arg, str) else arg for arg in error.args)
+    if getattr(error, "filename", None) == old:
+        error.filename = new
+
+
+def failed_file(task, reason, variant_count=None):
+    index, source = task
+    filename = source_name(source)
+    logging.warning("%s while processing %s, restarting the worker", reason, filename)
+    item = SerializedItem(FailedFileItem(filename, reason), index)
+    return item if variant_count is None else [item] * variant_count
+
+
+def process_files(files, output, parse, options=None, parse_source=None):
+    """Process all the `files` with `parse` and output the results in `output`
+
+    Args:
+        files: an iterable of paths, typically the result of `iglob`. The
+            packs among them are replaced by the files they contain, see
+            `ast_common.pack`
+        output: the path to a file without extension where to output results
+        parse: a picklable function `parse(filename, options)` returning
+            the list of AST nodes of a file, or with the `variants` option
+            the list of the lists of AST nodes of every variant, an
+            exception standing for a variant that failed
+        parse_source: a picklable function `parse_source(source, options)`
+            returning the list of AST nodes of the content of a file as
+            bytes, used for the files read from archives if given
+        options: a dict of options, the following keys are used
+            generator: the name of the generator module behind `parse`
+            normalize: whether `parse` normalizes the ASTs
+            min_nodes, max_nodes: bounds on the number of nodes of an AST
+            workers: the number of worker processes, defaults to the
+                number of CPUs
+            stream: send files to the workers while `files` is still
+                being iterated instead of listing all of them first
+            max_pending: in stream mode, the maximum number of discovered
+                files waiting to be processed
+            batch_size: workers process chunks of `batch_size` files and
+                return all their results at once
+            timeout: the maximum number of seconds spent on a single
+                file, its worker is killed and the file recorded as
+                failed with reason "timeout" past it
+            max_tasks_per_worker: the number of files after which a
+                worker is replaced by a fresh one
+            max_worker_memory: the resident memory in MB past which a
+                worker is replaced by a fresh one
+            schedule: "size" to dispatch files largest first, packing
+                smaller files into larger chunks (see `schedule_by_size`),
+                "adaptive" to adapt the chunk size to the observed cost of
+                the files (see `AdaptiveChunker`), by default files are
+                dispatched in discovery order in chunks of `batch_size`
+            target_chunk_seconds: the duration of a chunk aimed at by the
+                adaptive schedule, defaults to 1 second
+            ordered: write the results in the order of `files` rather
+                than as they are processed
+            reorder_buffer: in ordered mode, the size in MB of the results
+                kept in memory while waiting for an earlier one, no new
+                files are dispatched past it, defaults to 256
+            checkpoint_interval: the number of seconds between two
+                checkpoints of the outputs, defaults to 60, 0 disables them
+            resume: skip the files already written at the last checkpoint
+                of a previous run and append to its outputs
+            incremental: only process the files that are new or changed
+                since the previous run according to `output`.manifest,
+                and merge their records into the existing outputs
+            cache_dir: a directory where to cache the generated ASTs by
+                content, see `ASTCache`
+            cache_size: the maximum size in MB of the cache, the least
+                recently used entries are evicted past it during and at
+                the end of the run, defaults to 1024
+            dedup: only process the first of the files with the same
+                content, recording the others in `output`_duplicates.txt,
+                see `Deduplicator`
+            dedup_asts: only write the first of the identical ASTs,
+                indexing the files they were generated from in
+                `output`_trees.txt, see `TreeIndex`
+            shards: write the results to this number of shards by as
+                many writer processes, see `ShardedWriter`, without
+                checkpoints
+            partition: a string "i/N" to only process the files in the
+                partition i (from 0 to N - 1) of N by a stable hash of
+                their path, so that N hosts can share the files of a run
+                without coordination when they glob the same paths
+            compression: the codec compressing `output`.json by blocks in
+                parallel threads, "gzip", "bz2", "xz" or "zstd" if
+                installed, see `ast_common.compression`
+            archive_members: a `fnmatch` pattern, the tar and zip archives
+                of `files` are then replaced by their members matching it
+                and named `archive`!`member`, which implies stream mode,
+                see `ast_common.archive`
+            variants: the names of the generator variants produced at once
+                by `parse`, whose results are written to `output`_`variant`
+            preload: names of modules whose `preload` function loads a
+                parser used by `parse`, besides the module of `parse`,
+                see `pool.preload_modules`
+            routes: a dict mapping file extensions to names, such as
+                languages, only the files with these extensions are
+                processed and their results are written to `output`_`name`,
+                with a report of every name in `output`.metrics.json
+    """
+    options = dict(options or {})
+    options.setdefault("generator", "{0}.{1}".format(parse.__module__, parse.__qualname__))
+
+    discovered = Value("q", 0)
+    archive_members = options.get("archive_members")
+    stream = options.get("stream", False) or bool(archive_members)
+    batch_size = options.get("batch_size", 16)
+    workers = options.get("workers") or os.cpu_count() or 1
+    schedule = options.get("schedule")
+    ordered = options.get("ordered", False)
+    if stream and schedule == "size":
+        raise ValueError("size scheduling needs all the files, it cannot be used in stream mode")
+    if ordered and schedule == "size":
+        raise ValueError("size scheduling does not keep the order of the files, it cannot be ordered")
+    if options.get("dedup", False) and options.get("incremental", False):
+        raise ValueError("deduplication needs all the files, it cannot be incremental")
+    if options.get("dedup_asts", False) and (options.get("incremental", False) or options.get("resume", False)):
+        raise ValueError("AST deduplication needs all the ASTs, it cannot be incremental or resumed")
+    shards = options.get("shards")
+    if shards and (ordered or options.get("dedup_asts", False) or options.get("incremental", False)
+                   or options.get("resume", False)):
+        raise ValueError("sharded outputs cannot be ordered, deduplicated by AST, incremental or resumed")
+    compression = options.get("compression")
+    if compression and (options.get("incremental", False) or options.get("resume", False)):
+        raise ValueError("compressed outputs cannot be incremental or resumed")
+    variants = options.get("variants")
+    if variants and (options.get("incremental", False) or options.get("resume", False)
+                     or options.get("dedup_asts", False) or options.get("cache_dir")):
+        raise ValueError("several variants cannot be incremental, resumed, deduplicated by AST or cached")
+    routes = options.get("routes")
+    if routes and (variants or ordered or options.get("incremental", False) or options.get("resume", False)
+                   or options.get("dedup", False) or options.get("dedup_asts", False)
+                   or options.get("cache_dir")):
+        raise ValueError("routed files cannot have several variants or be ordered, incremental, resumed, "
+                         "deduplicated or cached")
+    if archive_members and options.get("incremental", False):
+        raise ValueError("archive members have no modification time, they cannot be processed incrementally")
+
+    if archive_members:
+        files = expand_archives(files, archive_members)
+    files = expand_packs(files)
+    if routes:
+        files = (source for source in files if route(source_name(source), routes) is not None)
+    if options.get("partition"):
+        index, count = parse_partition(options["partition"])
+        logging.info("processing the partition %s of %s", index, count)
+        files = partition_files(files, index, count)
+
+    checkpoint_interval = options.get("checkpoint_interval", 60)
+    manifest = None
+    target = output
+    if options.get("incremental", False):
+        manifest = Manifest(output, variant_key(options))
+        files = manifest.changed_files(files)
+        target = output + ".delta"
+    deduplicator = None
+    if options.get("dedup", False):
+        deduplicator = Deduplicator(output)
+        files = deduplicator.unique_files(files)
+    done = resume_outputs(target) if options.get("resume", False) else None
+    if done is not None:
+        logging.info("resuming after %s already processed files", len(done))
+        files = (source for source in files if source_name(source) not in done)
+    elif options.get("resume", False):
+        logging.warning("no checkpoint to resume from, starting from scratch")
+
+    if stream:
+        logging.info("starting to parse files while discovering them")
+        files = discover_files(files, max(options.get("max_pending", 10000), batch_size), discovered)
+    else:
+        files = list(files)
+        discovered.value = len(files)
+        logging.info("starting to parse %s files", discovered.value)
+    files = enumerate(files)
+
+    resume = done is not None
+    trees = TreeIndex(output) if options.get("dedup_asts", False) else None
+
+    def make_writer(target, discovered):
+        if shards:
+            return ShardedWriter(target, discovered, shards, compression)
+        if ordered:
+            return ReorderingWriter(target, discovered, options.get("reorder_buffer", 256) * 1024 * 1024,
+                                    checkpoint_interval, resume, trees, compression)
+        return ResultWriter(target, discovered, checkpoint_interval, resume, trees, compression)
+
+    if variants:
+        # only the writer of the first variant logs the progress
+        writer = MultiWriter([make_writer(variant_output(target, variant), discovered if i == 0 else None)
+                              for i, variant in enumerate(variants)])
+    elif routes:
+        writer = RoutingWriter({name: make_writer(variant_output(target, name), None)
+                                for name in sorted(set(routes.values()))},
+                               functools.partial(route, routes=routes), discovered)
+    else:
+        writer = make_writer(target, discovered)
+
+    max_worker_memory = options.get("max_worker_memory")
+    on_done = None
+    if schedule == "size":
+        chunks = schedule_by_size(files, workers, batch_size)
+    elif schedule == "adaptive":
+        chunks = AdaptiveChunker(files, options.get("target_chunk_seconds", 1.0), batch_size)
+        on_done = chunks.record
+    else:
+        chunks = split_chunks(files, batch_size)
+    if ordered:
+        chunks = throttle(chunks, writer)
+
+    failed_result = functools.partial(failed_file, variant_count=len(variants)) if variants else failed_file
+    preload_modules([parse.__module__] + options.get("preload", []))
+    pool = WorkerPool(process_file, workers, process_file_init, (parse, options, parse_source),
+                      options.get("timeout"), failed_result, options.get("max_tasks_per_worker"),
+                      max_worker_memory and max_worker_memory * 1024 * 1024)
+    cache = None
+    if options.get("cache_dir"):
+        cache = ASTCache(options["cache_dir"], options, options.get("cache_size", 1024) * 1024 * 1024)
+    with writer:
+        for items in pool.imap_unordered(chunks, on_done):
+            for item in items:
+                writer.write(item)
+                if manifest is not None:
+                    manifest.record(item)
+                if cache is not None:
+                    cache.record(item.cache_bytes)
+    if manifest is not None:
+        manifest.merge(output, target)
+    if deduplicator is not None:
+        deduplicator.close()
+    if trees is not None:
+        trees.close()
+    if cache is not None:
+        cache.evict()
+    if stream:
+        logging.info("discovered %s files", discovered.value)
+    log_pool_stats(pool)
+    if variants:
+        for variant, variant_writer in zip(variants, writer.writers):
+            logging.info("successfully processed %s files with the %s variant", variant_writer.success_count, variant)
+    elif routes:
+        report = writer.report()
+        for name, metrics in report.items():
+            logging.info("%s: successfully processed %s files, %s failed, %.1f seconds of parsing",
+                         name, metrics["success"], metrics["failed"], metrics["seconds"])
+        with open(output + ".metrics.json", "w") as f:
+            json.dump(report, f, indent=1)
+        logging.info("successfully processed %s files", writer.success_count)
+    else:
+        logging.info("successfully processed %s files", writer.success_count)
+
+
+def variant_output(output, variant):
+    return "{0}_{1}".format(output, variant)
+
+
+def route(filename, routes):
+    """Returns the name the extension of `filename` is routed to, if any"""
+    return routes.get(os.path.splitext(filename)[1])
+
+
+def process_records(records, out, parse, options=None, parse_source=None):
+    """Process the source records read from `records` and write the results
+    to `out` as soon as they are processed, see `ast_common.jsonl`
+
+    Args:
+        records: a binary file of JSON lines, such as `sys.stdin.buffer`
+        out: a binary file where to write JSON lines, such as
+            `sys.stdout.buffer`, flushed after every batch of results
+        parse, parse_source: the functions parsing the records as in
+            `process_files`, `parse` being given a temporary file
+        options: a dict of options, the following keys are used
+            generator, normalize, min_nodes, max_nodes, workers,
+            max_pending, batch_size, timeout, max_tasks_per_worker,
+            max_worker_memory, cache_dir, cache_size: as in `process_files`
+            record_suffix: the extension of the temporary files given to
+                `parse`, such as ".c"
+    """
+    options = dict(options or {})
+    options.setdefault("generator", "{0}.{1}".format(parse.__module__, parse.__qualname__))
+    batch_size = options.get("batch_size", 16)
+    workers = options.get("workers") or os.cpu_count() or 1
+    discovered = Value("q", 0)
+
+    sources = read_records(records, options.get("record_suffix", ""))
+    sources = discover_files(sources, max(options.get("max_pending", 10000), batch_size), discovered)
+    writer = RecordWriter(out)
+    chunks = split_chunks(writer.track(enumerate(sources)), batch_size)
+
+    max_worker_memory = options.get("max_worker_memory")
+    preload_modules([parse.__module__] + options.get("preload", []))
+    pool = WorkerPool(process_file, workers, process_file_init, (parse, options, parse_source),
+                      options.get("timeout"), failed_file, options.get("max_tasks_per_worker"),
+                      max_worker_memory and max_worker_memory * 1024 * 1024)
+    cache = None
+    if options.get("cache_dir"):
+        cache = ASTCache(options["cache_dir"], options, options.get("cache_size", 1024) * 1024 * 1024)
+    for items in pool.imap_unordered(chunks):
+        for item in items:
+            writer.write(item)
+            if cache is not None:
+                cache.record(item.cache_bytes)
+        out.flush()
+    if cache is not None:
+        cache.evict()
+    log_pool_stats(pool)
+    logging.info("successfully processed %s of %s records", writer.success_count, discovered.value)
+
+
+def log_pool_stats(pool):
+    if pool.timeout_count or pool.crash_count:
+        logging.info("restarted workers after %s timeouts and %s crashes",
+                     pool.timeout_count, pool.crash_count)
+    if any(pool.recycle_counts.values()):
+        logging.info("recycled workers %s times after max tasks and %s times after max memory",
+                     pool.recycle_counts["tasks"], pool.recycle_counts["memory"])
+
+
+def parse_partition(partition):
+    """Returns the index and count of a partition "i/N" """
+    try:
+        index, count = (int(part) for part in partition.split("/"))
+    except ValueError:
+        raise ValueError("invalid partition {0}, expected i/N".format(partition)) from None
+    if not 0 <= index < count:
+        raise ValueError("invalid partition {0}, expected 0 <= i < N".format(partition))
+    return index, count
+
+
+def partition_files(files, index, count):
+    """Yields the files of `files` in the partition `index` out of `count`.
+    The partitions depend on the SHA-1 of the paths, which is stable across
+    hosts and independent from the shard of their results."""
+    for source in files:
+        digest = hashlib.sha1(source_name(source).encode("utf-8")).digest()
+        if int.from_bytes(digest[:8], "big") % count == index:
+            yield source
+
+
+def split_chunks(files, size):
+    """Yields lists of at most `size` consecutive tasks"""
+    chunk = []
+    for filename in files:
+        chunk.append(filename)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def schedule_by_size(files, workers, batch_size):
+    """Yields lists of the `(index, filename)` tasks of `files` ordered from
+    the largest to the smallest file, using the file size as an estimate of
+    the processing cost.
+
+    Chunks are cut whenever they reach 1/4th of the remaining bytes per
+    worker, so that the largest files come first in small chunks, the
+    bulk of small files is packed into large chunks and the chunks get
+    smaller again towards the end of the run to balance its tail. A chunk
+    is never smaller than `batch_size` files of average size."""
+    sized_files = [(task, file_size(task[1])) for task in files]
+    sized_files.sort(key=lambda sized_file: sized_file[1], reverse=True)
+    remaining = sum(size for _, size in sized_files)
+    min_chunk_bytes = remaining / max(len(sized_files), 1) * batch_size
+    logging.info("scheduling %s bytes by size over %s workers", remaining, workers)
+    chunk = []
+    chunk_bytes = 0
+    for task, size in sized_files:
+        chunk.append(task)
+        chunk_bytes += size
+        if chunk_bytes >= max(remaining / (4 * workers), min_chunk_bytes):
+            yield chunk
+            remaining -= chunk_bytes
+            chunk = []
+            chunk_bytes = 0
+    if chunk:
+        yield chunk
+
+
+class AdaptiveChunker:
+    """Iterates over chunks of `files` whose size adapts to the observed
+    processing time, so that a chunk takes about `target_seconds`.
+
+    Tiny files are then sent in large chunks amortizing the IPC overhead,
+    while expensive files are sent in small chunks that balance well. The
+    size is a power of two between 1 and `max_size`, derived from a moving
+    average of the time per file reported to `record`. It shrinks at once
+    but grows at most 4 times per chunk, as the first measures may not be
+    representative."""
+    def __init__(self, files, target_seconds, size, max_size=4096):
+        self.files = iter(files)
+        self.target_seconds = target_seconds
+        self.size = size
+        self.max_size = max_size
+        self.seconds_per_file = None
+
+    def __iter__(self):
+        while True:
+            chunk = list(itertools.islice(self.files, self.size))
+            if not chunk:
+                break
+            yield chunk
+
+    def record(self, count, seconds):
+        seconds_per_file = seconds / count
+        if self.seconds_per_file is None:
+            self.seconds_per_file = seconds_per_file
+        else:
+            self.seconds_per_file = 0.8 * self.seconds_per_file + 0.2 * seconds_per_file
+        size = self.target_seconds / max(self.seconds_per_file, 1e-9)
+        size = min(2 ** max(round(math.log2(max(size, 1))), 0), self.max_size, self.size * 4)
+        if size != self.size:
+            logging.info("chunk size: %s files (%.3f ms per file)", size, self.seconds_per_file * 1000)
+            self.size = size
+
+
+def file_size(source):
+    try:
+        if not isinstance(source, str):
+            return len(source.data)
+        return os.path.getsize(source)
+    except OSError:
+        return 0
+
+
+def throttle(chunks, writer):
+    """Yields the `chunks`, yielding empty chunks instead while the reorder
+    buffer of `writer` is full so that the pool waits for results without
+    dispatching new files"""
+    for chunk in chunks:
+        while writer.is_full():
+            yield []
+        yield chunk
+
+
+def discover_files(files, max_pending, discovered):
+    """Iterates `files` in a background thread, yielding them as they are
+    found while keeping at most `max_pending` of them in memory and
+    counting them in `discovered`. An exception raised by `files` is
+    raised again by the generator, after the files found before it"""
+    pending = queue.Queue(max_pending)
+
+    def walk():
+        try:
+            for filename in files:
+                pending.put(filename)
+                with discovered.get_lock():
+                    discovered.value += 1
+        except BaseException as e:  # pylint: disable=broad-except
+            # sent in place of the end of the files
+            pending.put(e)
+        else:
+            pending.put(None)
+
+    threading.Thread(target=walk, daemon=True).start()
+    while True:
+        filename = pending.get()
+        if filename is None:
+            break
+        if isinstance(filename, BaseException):
+            raise filename
+        yield filename
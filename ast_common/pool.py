@@ -0,0 +1,273 @@
+"""Process pool used by the extraction pipeline.
+
+Unlike `multiprocessing.Pool`, it knows which task every worker is running,
+so that a worker stuck on a pathological input (or killed by the system)
+can be replaced without stalling or losing the rest of the run.
+
+Workers are forked from a fork server where possible, so that they start
+in milliseconds with the modules and parser state it preloaded, see
+`preload_modules`. They are never forked from the main process itself,
+whose threads (discovery, hashing, compression) may hold locks at that
+moment. macOS, where forking is not safe with the system frameworks, spawns
+them.
+"""
+
+import multiprocessing
+import os
+import resource
+import sys
+import time
+import traceback
+from collections import deque
+from multiprocessing import Pipe, RawArray
+from multiprocessing.connection import wait
+
+
+if sys.platform != "darwin" and "forkserver" in multiprocessing.get_all_start_methods():
+    context = multiprocessing.get_context("forkserver")
+else:
+    context = multiprocessing.get_context()
+
+# the environment variable naming the modules preloaded by the fork server
+PRELOAD_VARIABLE = "AST_PRELOAD"
+
+
+class WorkerInitError(RuntimeError):
+    """Raised by the pool when the initializer of a worker failed, since
+    every replacement of the worker would fail the same way"""
+
+
+def preload_modules(names):
+    """Makes the fork server call the `preload` function of the modules
+    `names` when it starts. The fork server is started once per process,
+    with its first worker, later calls have no effect on it, the workers
+    then preloading their parser themselves."""
+    if context.get_start_method() != "forkserver":
+        return
+    os.environ[PRELOAD_VARIABLE] = ",".join(names)
+    # the fork server is a new interpreter, which only finds ast_common
+    # through PYTHONPATH if it was added to sys.path at run time
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    paths = [path for path in os.environ.get("PYTHONPATH", "").split(os.pathsep) if path]
+    if root not in paths:
+        os.environ["PYTHONPATH"] = os.pathsep.join([root] + paths)
+    context.set_forkserver_preload(["ast_common.preload"])
+
+
+def resident_memory():
+    """Returns the resident set size of the current process in bytes, or
+    its peak resident set size where the current one is not available"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage if sys.platform == "darwin" else usage * 1024
+
+
+def worker_main(conn, progress, func, initializer, initargs, max_tasks, max_memory):
+    """Applies `func` to every task of the chunks received on `conn`,
+    recording in `progress` the index and start time of the current task.
+
+    Every chunk is answered with its list of results and the reason why the
+    worker retires after it, if it processed `max_tasks` tasks or uses more
+    than `max_memory` bytes. If `initializer` fails, its error is sent
+    instead of the results of the first chunk."""
+    if initializer is not None:
+        try:
+            initializer(*initargs)
+        except Exception as e:
+            error = "".join(traceback.format_exception_only(type(e), e)).strip()
+            conn.send((None, error))
+            # reading the chunk before exiting, so that the error is not
+            # discarded with the unread data of a reset connection
+            try:
+                conn.recv()
+            except EOFError:
+                pass
+            conn.close()
+            return
+    task_count = 0
+    while True:
+        chunk = conn.recv()
+        if chunk is None:
+            break
+        results = []
+        for index, task in enumerate(chunk):
+            progress[0] = index
+            progress[1] = time.monotonic()
+            results.append(func(task))
+        progress[1] = 0
+        task_count += len(chunk)
+        retire = None
+        if max_tasks and task_count >= max_tasks:
+            retire = "tasks"
+        elif max_memory and resident_memory() > max_memory:
+            retire = "memory"
+        conn.send((results, retire))
+        if retire:
+            break
+    conn.close()
+
+
+class Worker:
+    def __init__(self, func, initializer, initargs, max_tasks, max_memory):
+        self.conn, child_conn = Pipe()
+        self.progress = RawArray("d", 2)
+        self.process = context.Process(target=worker_main,
+                                       args=(child_conn, self.progress, func, initializer, initargs,
+                                             max_tasks, max_memory),
+                                       daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.chunk = None
+        self.assigned_at = None
+
+    def assign(self, chunk):
+        self.chunk = chunk
+        self.assigned_at = time.monotonic()
+        self.progress[0] = 0
+        try:
+            self.conn.send(chunk)
+        except OSError:
+            # the worker died while idle, its sentinel reports it as crashed
+            pass
+
+    def elapsed(self):
+        """Returns for how long the current task has been running"""
+        started = self.progress[1]
+        if not started:
+            return 0
+        return time.monotonic() - started
+
+    def current_index(self):
+        return int(self.progress[0])
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join()
+        self.conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class WorkerPool:
+    """Applies `func` to chunks of tasks in `processes` worker processes
+
+    Args:
+        func: a picklable function applied to every task
+        processes: the number of workers, defaults to the number of CPUs
+        initializer, initargs: called as `initializer(*initargs)` when a
+            worker starts, `WorkerInitError` being raised if it fails
+        timeout: the maximum number of seconds a single task may run, the
+            worker is killed and replaced past it
+        failed_result: a function `failed_result(task, reason)` returning
+            the result of a task whose worker was killed or crashed
+        max_tasks: the number of tasks after which a worker is replaced
+        max_memory: the resident memory in bytes past which a worker is
+            replaced, checked after every chunk
+    """
+    def __init__(self, func, processes=None, initializer=None, initargs=(),
+                 timeout=None, failed_result=None, max_tasks=None, max_memory=None):
+        self.func = func
+        self.processes = processes or os.cpu_count() or 1
+        self.initializer = initializer
+        self.initargs = initargs
+        self.timeout = timeout
+        self.failed_result = failed_result
+        self.max_tasks = max_tasks
+        self.max_memory = max_memory
+        self.timeout_count = 0
+        self.crash_count = 0
+        self.recycle_counts = {"tasks": 0, "memory": 0}
+
+    def start_worker(self):
+        return Worker(self.func, self.initializer, self.initargs, self.max_tasks, self.max_memory)
+
+    def imap_unordered(self, chunks, on_done=None):
+        """Yields the list of results of every chunk of `chunks` as soon as
+        it is processed. A new chunk is only taken from `chunks` when a
+        worker is idle, an empty chunk meaning that nothing should be
+        dispatched until the next result.
+
+        If given, `on_done(size, seconds)` is called with the number of
+        tasks and the wall-clock time of every successful chunk, before the
+        next chunk is taken from `chunks`."""
+        chunks = iter(chunks)
+        retries = deque()
+        idle = [self.start_worker() for _ in range(self.processes)]
+        busy = []
+        try:
+            while True:
+                while idle:
+                    chunk = retries.popleft() if retries else next(chunks, None)
+                    if not chunk:
+                        break
+                    worker = idle.pop()
+                    worker.assign(chunk)
+                    busy.append(worker)
+                if not busy:
+                    break
+                waitables = [worker.conn for worker in busy] + [worker.process.sentinel for worker in busy]
+                ready = wait(waitables, self.wait_timeout(busy))
+                for worker in list(busy):
+                    if worker.conn in ready:
+                        try:
+                            results, retire = worker.conn.recv()
+                        except (EOFError, OSError):
+                            results = retire = None
+                        if results is None and retire is not None:
+                            raise WorkerInitError("worker initialization failed: " + retire)
+                        if results is not None:
+                            busy.remove(worker)
+                            if on_done is not None:
+                                on_done(len(worker.chunk), time.monotonic() - worker.assigned_at)
+                            if retire:
+                                worker.stop()
+                                self.recycle_counts[retire] += 1
+                                worker = self.start_worker()
+                            idle.append(worker)
+                            yield results
+                            continue
+                    if worker.process.sentinel in ready or worker.conn in ready:
+                        reason = None
+                        self.crash_count += 1
+                    elif self.timeout and worker.elapsed() > self.timeout:
+                        reason = "timeout"
+                        self.timeout_count += 1
+                    else:
+                        continue
+                    busy.remove(worker)
+                    results, rest = self.abandon(worker, reason)
+                    if rest:
+                        retries.append(rest)
+                    idle.append(self.start_worker())
+                    yield results
+        finally:
+            for worker in idle:
+                worker.stop()
+            for worker in busy:
+                worker.kill()
+
+    def wait_timeout(self, busy):
+        if not self.timeout:
+            return None
+        remaining = min(self.timeout - worker.elapsed() for worker in busy)
+        return max(remaining, 0.01)
+
+    def abandon(self, worker, reason):
+        """Kills `worker` and returns the failed result of its current task
+        along with the rest of its chunk, which has to be processed again"""
+        worker.kill()
+        if reason is None:
+            reason = "worker exited with code {0}".format(worker.process.exitcode)
+        index = worker.current_index()
+        task = worker.chunk[index]
+        rest = worker.chunk[:index] + worker.chunk[index + 1:]
+        return [self.failed_result(task, reason)], rest
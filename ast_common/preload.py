@@ -0,0 +1,26 @@
+"""Imported by the fork server of the worker pool when it starts, see
+`pool.preload_modules`: calls the `preload` function of the modules named
+in the AST_PRELOAD environment variable, so that every worker forked from
+the server inherits their loaded parsers. The only module with an import
+side effect, it is not meant to be imported otherwise.
+"""
+
+import importlib
+import logging
+import os
+
+from ast_common.pool import PRELOAD_VARIABLE
+
+
+def preload(names):
+    for name in names:
+        try:
+            module = importlib.import_module(name)
+            if hasattr(module, "preload"):
+                module.preload()
+        except Exception as e:  # pylint: disable=broad-except
+            # the workers load it themselves and report the error per file
+            logging.debug("failed to preload %s: %s", name, e)
+
+
+preload(filter(None, os.environ.get(PRELOAD_VARIABLE, "").split(",")))
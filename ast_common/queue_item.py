@@ -0,0 +1,78 @@
+import json
+
+
+class ProcessedFileItem:
+    def __init__(self, filename, ast, options):
+        self.filename = filename
+        self.ast = ast
+        self.node_count = len(ast)
+        self.min_nodes = options.get("min_nodes", 0)
+        self.max_nodes = options.get("max_nodes", 10000000)
+        self._encoded_ast = None
+
+    @property
+    def success(self):
+        if self.min_nodes <= self.node_count <= self.max_nodes:
+            return True
+        return False
+
+    @property
+    def reason(self):
+        if self.node_count < self.min_nodes:
+            return "too few nodes"
+        if self.node_count > self.max_nodes:
+            return "too many nodes"
+
+    def encode(self):
+        """Returns the AST as a newline-terminated UTF-8 JSON line"""
+        if self._encoded_ast is None:
+            self._encoded_ast = (json.dumps(self.ast) + "\n").encode("utf-8")
+        return self._encoded_ast
+
+
+class EncodedFileItem(ProcessedFileItem):
+    """A processed file whose AST is already encoded, e.g. read from the
+    AST cache"""
+    def __init__(self, filename, encoded_ast, node_count, options):
+        super().__init__(filename, [], options)
+        self.node_count = node_count
+        self._encoded_ast = encoded_ast
+
+
+class FailedFileItem:
+    def __init__(self, filename, raw_reason):
+        self.filename = filename
+        self.raw_reason = raw_reason
+        self.node_count = 0
+        self.success = False
+
+    @property
+    def reason(self):
+        return str(self.raw_reason)
+
+
+class SerializedItem:
+    """An item already encoded by a worker as newline-terminated UTF-8
+    lines, so that the writer only has to append them. `index` is the
+    position of the file in the input."""
+    def __init__(self, item, index=None):
+        self.filename = item.filename
+        self.index = index
+        self.digest = None
+        self.tree_digest = None
+        self.seconds = 0
+        # the number of bytes the worker wrote to the AST cache
+        self.cache_bytes = 0
+        self.success = item.success
+        self.node_count = item.node_count
+        self.reason = None if self.success else item.reason
+        if self.success:
+            self.ast = item.encode()
+            self.line = (item.filename + "\n").encode("utf-8")
+        else:
+            self.ast = None
+            self.line = (item.filename + "\t" + item.reason + "\n").encode("utf-8")
+
+    @property
+    def size(self):
+        return len(self.line) + (len(self.ast) if self.ast else 0)
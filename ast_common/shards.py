@@ -0,0 +1,186 @@
+"""Output of the results to shards written by separate processes.
+
+Results are partitioned by a stable hash of their filename to the shards
+`output`-00000 to `output`-0000N, each with its own .json, .txt and
+_failed.txt files written by a dedicated writer process. The number of
+results of every shard is recorded in `output`.shards.json, along with the
+name of its outputs relative to the directory of `output`.
+
+The parent only appends the serialized lines of every item to the batch of
+its shard, every batch being sent as its counts followed by its raw .json,
+.txt and _failed.txt bytes rather than as pickled items.
+"""
+
+import errno
+import json
+import logging
+import os
+import traceback
+import zlib
+from multiprocessing import Pipe
+
+from ast_common.pool import context
+from ast_common.writer import ResultWriter
+
+
+def path_hash(filename):
+    """Returns a hash of `filename` that is stable across runs and platforms,
+    unlike `hash`"""
+    return zlib.crc32(filename.encode("utf-8"))
+
+
+def shard_output(output, shard):
+    return "{0}-{1:05d}".format(output, shard)
+
+
+class ShardBatch:
+    """The serialized lines of a batch of items of a shard"""
+    def __init__(self):
+        self.asts = bytearray()
+        self.lines = bytearray()
+        self.failed_lines = bytearray()
+        self.success_count = 0
+        self.failure_count = 0
+
+    def add(self, item):
+        if item.success:
+            self.asts += item.ast
+            self.lines += item.line
+            self.success_count += 1
+        else:
+            self.failed_lines += item.line
+            self.failure_count += 1
+
+    def __len__(self):
+        return self.success_count + self.failure_count
+
+    def send(self, conn):
+        conn.send((self.success_count, self.failure_count))
+        conn.send_bytes(self.asts)
+        conn.send_bytes(self.lines)
+        conn.send_bytes(self.failed_lines)
+
+
+class ShardWriterError(RuntimeError):
+    """Raised when the writer process of a shard stopped before its end"""
+
+
+def shard_writer_main(conn, output, compression):
+    """Writes the batches received on `conn` to `output` until None is
+    received, then answers with the numbers of successes and failures, or
+    with the error which stopped it"""
+    try:
+        with ResultWriter(output, None, compression=compression) as writer:
+            while True:
+                counts = conn.recv()
+                if counts is None:
+                    break
+                success_count, failure_count = counts
+                writer.write_batch(conn.recv_bytes(), conn.recv_bytes(), conn.recv_bytes(),
+                                   success_count, failure_count)
+    except Exception as e:  # pylint: disable=broad-except
+        conn.send("".join(traceback.format_exception_only(type(e), e)).strip())
+    else:
+        conn.send((writer.success_count, writer.failure_count))
+    conn.close()
+
+
+class ShardedWriter:
+    """Writes items like a `ResultWriter` but to `shards` shards of `output`,
+    sending them to the writer processes by batches of `batch_size`"""
+    def __init__(self, output, discovered, shards, compression=None, batch_size=256):
+        self.output = output
+        self.discovered = discovered
+        self.shards = shards
+        self.compression = compression
+        self.batch_size = batch_size
+        self.success_count = 0
+        self.failure_count = 0
+        self.conns = []
+        self.processes = []
+        self.pending = [ShardBatch() for _ in range(shards)]
+        # the errors of the writers which stopped, by shard
+        self.errors = {}
+
+    def __enter__(self):
+        # failing before the run rather than in every writer
+        directory = os.path.dirname(self.output) or "."
+        if not os.path.isdir(directory):
+            raise FileNotFoundError(errno.ENOENT, "no such output directory", directory)
+        for shard in range(self.shards):
+            conn, child_conn = Pipe()
+            process = context.Process(target=shard_writer_main,
+                                      args=(child_conn, shard_output(self.output, shard), self.compression),
+                                      daemon=True)
+            process.start()
+            child_conn.close()
+            self.conns.append(conn)
+            self.processes.append(process)
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        for shard, conn in enumerate(self.conns):
+            if shard in self.errors:
+                continue
+            try:
+                if self.pending[shard]:
+                    self.pending[shard].send(conn)
+                conn.send(None)
+            except OSError:
+                # the writer stopped, its error is received below
+                pass
+        counts = []
+        for shard, conn in enumerate(self.conns):
+            result = self.receive(shard)
+            conn.close()
+            success_count, failure_count = result if isinstance(result, tuple) else (None, None)
+            counts.append({"output": os.path.basename(shard_output(self.output, shard)),
+                           "success": success_count, "failed": failure_count})
+        tmp = self.output + ".shards.json.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"shards": counts}, f, indent=1)
+        os.replace(tmp, self.output + ".shards.json")
+        if self.errors and exc_type is None:
+            raise self.error()
+
+    def receive(self, shard):
+        """Returns the counts of the writer of `shard` once it stopped, or
+        records its error and returns None"""
+        if shard in self.errors:
+            return None
+        try:
+            result = self.conns[shard].recv()
+        except (EOFError, OSError):
+            result = None
+        process = self.processes[shard]
+        process.join()
+        if isinstance(result, tuple):
+            return result
+        if result is None:
+            result = "exited with code {0}".format(process.exitcode)
+        logging.error("writer of shard %s failed: %s", shard, result)
+        self.errors[shard] = result
+        return None
+
+    def error(self):
+        return ShardWriterError("; ".join("writer of shard {0} failed: {1}".format(shard, error)
+                                          for shard, error in sorted(self.errors.items())))
+
+    def write(self, item):
+        shard = path_hash(item.filename) % self.shards
+        pending = self.pending[shard]
+        pending.add(item)
+        if len(pending) >= self.batch_size:
+            try:
+                pending.send(self.conns[shard])
+            except OSError:
+                self.receive(shard)
+                raise self.error() from None
+            self.pending[shard] = ShardBatch()
+        if item.success:
+            self.success_count += 1
+        else:
+            self.failure_count += 1
+        current_count = self.success_count + self.failure_count
+        if self.discovered is not None and current_count % 1000 == 0:
+            logging.info("progress: %s/%s", current_count, self.discovered.value)
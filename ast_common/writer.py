@@ -0,0 +1,244 @@
+"""Writing of the results of the pipeline to `output`.json, `output`.txt
+and `output`_failed.txt, with optional checkpoints to resume an
+interrupted run.
+"""
+
+import json
+import logging
+import os
+import time
+
+from ast_common.compression import open_output
+
+
+OUTPUT_SUFFIXES = {"json": ".json", "txt": ".txt", "failed": "_failed.txt"}
+
+
+class ResultWriter:
+    """Writes successfully processed items to `output`.json and `output`.txt
+    and failed ones to `output`_failed.txt, logging the progress.
+
+    Every `checkpoint_interval` seconds, the outputs are synced to disk and
+    their sizes committed to `output`.checkpoint, see `resume_outputs`. With
+    `resume`, the outputs are appended to instead of being overwritten.
+    The progress is logged against the `discovered` count, if given.
+
+    If given a `TreeIndex` `trees`, the ASTs already written are only
+    recorded in it. If given, `compression` is the codec compressing
+    `output`.json, see `open_output`."""
+    def __init__(self, output, discovered, checkpoint_interval=None, resume=False, trees=None,
+                 compression=None):
+        self.output = output
+        self.trees = trees
+        self.compression = compression
+        self.discovered = discovered
+        self.checkpoint_interval = checkpoint_interval
+        self.resume = resume
+        self.success_count = 0
+        self.failure_count = 0
+        self.last_checkpoint = None
+
+    def __enter__(self):
+        mode = "ab" if self.resume else "wb"
+        self.asts = open_output(self.output + ".json", mode, self.compression)
+        self.files = open(self.output + ".txt", mode)
+        self.failed_files = open(self.output + "_failed.txt", mode)
+        self.last_checkpoint = time.monotonic()
+        if not self.resume:
+            # the checkpoint of a previous run must not apply to the new outputs
+            if self.checkpoint_interval:
+                self.checkpoint()
+            else:
+                remove_checkpoint(self.output)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.checkpoint_interval:
+            self.checkpoint()
+        self.asts.close()
+        self.files.close()
+        self.failed_files.close()
+
+    def checkpoint(self):
+        """Syncs the outputs and atomically records their sizes, everything
+        written until now surviving a crash of the run"""
+        outputs = {"json": self.asts, "txt": self.files, "failed": self.failed_files}
+        for f in outputs.values():
+            f.flush()
+            os.fsync(f.fileno())
+        state = {key: f.tell() for key, f in outputs.items()}
+        tmp = self.output + ".checkpoint.tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.output + ".checkpoint")
+        self.last_checkpoint = time.monotonic()
+
+    def write(self, item):
+        try:
+            if item.success:
+                if self.trees is None or self.trees.add(item):
+                    write_successed_item(item, self.asts, self.files)
+                self.success_count += 1
+            else:
+                write_failed_item(item, self.failed_files)
+                self.failure_count += 1
+        except Exception as e: # pylint: disable=broad-except
+            logging.error("failed to write %s: %s", item.filename, e)
+            return
+        current_count = self.success_count + self.failure_count
+        if self.discovered is not None and current_count % 1000 == 0:
+            logging.info("progress: %s/%s", current_count, self.discovered.value)
+        if self.checkpoint_interval and time.monotonic() - self.last_checkpoint >= self.checkpoint_interval:
+            self.checkpoint()
+
+    def write_batch(self, asts, lines, failed_lines, success_count, failure_count):
+        """Writes the already joined lines of a batch of `success_count`
+        successes and `failure_count` failures"""
+        self.asts.write(asts)
+        self.files.write(lines)
+        self.failed_files.write(failed_lines)
+        self.success_count += success_count
+        self.failure_count += failure_count
+
+
+class ReorderingWriter(ResultWriter):
+    """A `ResultWriter` writing items in the order of their index, buffering
+    the ones arriving before an earlier item"""
+    def __init__(self, output, discovered, max_bytes, checkpoint_interval=None, resume=False, trees=None,
+                 compression=None):
+        super().__init__(output, discovered, checkpoint_interval, resume, trees, compression)
+        self.max_bytes = max_bytes
+        self.buffer = {}
+        self.buffered_bytes = 0
+        self.next_index = 0
+
+    def __exit__(self, *exc_info):
+        if self.buffer:
+            logging.error("%s results were never written, missing result %s",
+                          len(self.buffer), self.next_index)
+        super().__exit__(*exc_info)
+
+    def write(self, item):
+        self.buffer[item.index] = item
+        self.buffered_bytes += item.size
+        while self.next_index in self.buffer:
+            item = self.buffer.pop(self.next_index)
+            self.buffered_bytes -= item.size
+            super().write(item)
+            self.next_index += 1
+
+    def is_full(self):
+        return self.buffered_bytes >= self.max_bytes
+
+
+class MultiWriter:
+    """Writes the lists of results of the generator variants of every file,
+    each result with the writer of its variant"""
+    def __init__(self, writers):
+        self.writers = writers
+
+    def __enter__(self):
+        for writer in self.writers:
+            writer.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        for writer in self.writers:
+            writer.__exit__(*exc_info)
+
+    def write(self, items):
+        for writer, item in zip(self.writers, items):
+            writer.write(item)
+
+    def is_full(self):
+        return any(writer.is_full() for writer in self.writers)
+
+
+class RoutingWriter:
+    """Writes every item with the writer `writers`[`route(filename)`],
+    logging the combined progress and measuring the parsing time of every
+    route"""
+    def __init__(self, writers, route, discovered):
+        self.writers = writers
+        self.route = route
+        self.discovered = discovered
+        self.seconds = dict.fromkeys(writers, 0.0)
+        self.success_count = 0
+        self.failure_count = 0
+
+    def __enter__(self):
+        for writer in self.writers.values():
+            writer.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        for writer in self.writers.values():
+            writer.__exit__(*exc_info)
+
+    def write(self, item):
+        name = self.route(item.filename)
+        self.writers[name].write(item)
+        self.seconds[name] += item.seconds
+        if item.success:
+            self.success_count += 1
+        else:
+            self.failure_count += 1
+        current_count = self.success_count + self.failure_count
+        if current_count % 1000 == 0:
+            logging.info("progress: %s/%s", current_count, self.discovered.value)
+
+    def is_full(self):
+        return any(writer.is_full() for writer in self.writers.values())
+
+    def report(self):
+        """Returns the numbers of successes and failures and the parsing
+        time of every route"""
+        return {name: {"success": writer.success_count, "failed": writer.failure_count,
+                       "seconds": round(self.seconds[name], 3)}
+                for name, writer in self.writers.items()}
+
+
+def write_successed_item(item, asts, files):
+    asts.write(item.ast)
+    files.write(item.line)
+
+
+def write_failed_item(item, failed_files):
+    failed_files.write(item.line)
+
+
+def remove_checkpoint(output):
+    try:
+        os.remove(output + ".checkpoint")
+    except FileNotFoundError:
+        pass
+
+
+def resume_outputs(output):
+    """Truncates the outputs of an interrupted run to their sizes at its last
+    checkpoint and returns the set of the files they contain, or None if
+    there is no checkpoint to resume from. Raises a `ValueError` if an
+    output is smaller than at the checkpoint, which is not its own."""
+    try:
+        with open(output + ".checkpoint") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return None
+    for key, suffix in OUTPUT_SUFFIXES.items():
+        size = os.path.getsize(output + suffix)
+        if state[key] > size:
+            raise ValueError("{0} has {1} bytes, less than the {2} bytes of its checkpoint, "
+                             "it cannot be resumed".format(output + suffix, size, state[key]))
+    for key, suffix in OUTPUT_SUFFIXES.items():
+        with open(output + suffix, "r+b") as f:
+            f.truncate(state[key])
+    done = set()
+    with open(output + ".txt", "rb") as f:
+        for line in f:
+            done.add(line.rstrip(b"\n").decode("utf-8"))
+    with open(output + "_failed.txt", "rb") as f:
+        for line in f:
+            done.add(line.split(b"\t", 1)[0].decode("utf-8"))
+    return done
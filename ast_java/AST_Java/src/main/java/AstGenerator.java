@@ -35,7 +35,7 @@ public class AstGenerator {
         } else {
             result = JavaParser.parse(filepath);
         }
-        JsonVisitorFine visitor = new JsonVisitorFine();
+        JsonVisitorFine visitor = new JsonVisitorFine(maxNodes);
         List<Map<String, Object>> astNodes = new ArrayList<>();
         result.accept(visitor, astNodes);
         return astNodes;
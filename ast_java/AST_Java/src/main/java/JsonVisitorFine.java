@@ -24,7 +24,24 @@ public class JsonVisitorFine extends GenericVisitorAdapter<Integer, List<Map<Str
     public static String childrenKey = "children";
     public static String modifiersKey = "modifiers";
 
+    private final int maxNodes;
+
+    public JsonVisitorFine() {
+        this(Integer.MAX_VALUE);
+    }
+
+    /**
+     * @param maxNodes the maximum number of nodes to generate, visiting stops
+     *                 with a "too many nodes" exception once it is exceeded
+     */
+    public JsonVisitorFine(int maxNodes) {
+        this.maxNodes = maxNodes;
+    }
+
     private Map<String, Object> enterNode(Node node, List<Map<String, Object>> nodes) {
+        if (nodes.size() >= maxNodes) {
+            throw new RuntimeException("too many nodes");
+        }
         Map<String, Object> result = new HashMap<>();
         result.put(idKey, nodes.size());
         result.put(typeKey, node.getClass().getSimpleName());
@@ -33,6 +50,9 @@ public class JsonVisitorFine extends GenericVisitorAdapter<Integer, List<Map<Str
     }
 
     private Map<String, Object> enterNode(String nodename, List<Map<String, Object>> nodes) {
+        if (nodes.size() >= maxNodes) {
+            throw new RuntimeException("too many nodes");
+        }
         Map<String, Object> result = new HashMap<>();
         result.put(idKey, nodes.size());
         result.put(typeKey, nodename);
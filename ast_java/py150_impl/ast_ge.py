@@ -1,5 +1,8 @@
-import javalang
-from javalang import tree as jtree
+from ast_common.errors import TooManyNodesError
+from ast_common.lazy import LazyModule
+
+javalang = LazyModule("javalang")
+jtree = LazyModule("javalang.tree")
 
 
 def get_first_method_node(compilation_unit):
@@ -9,25 +12,35 @@ def get_first_method_node(compilation_unit):
     return None
 
 
-def parse_file(file_name, wrap_class=False):
+def preload():
+    """Imports javalang, once before the workers are forked so that they
+    inherit it"""
+    javalang.load()
+    jtree.load()
+
+
+def parse_file(file_name, wrap_class=False, max_nodes=None):
     with open(file_name, "r") as f:
         contents = f.read()
+    return parse_string(contents, wrap_class, max_nodes)
+
+
+def parse_string(contents, wrap_class=False, max_nodes=None):
     if wrap_class:
         source = "public class TEMP_CLASS  { %s }" % contents
     else:
         source = contents
-    return parse_java(source, wrap_class)
+    return parse_java(source, wrap_class, max_nodes)
 
 
-def parse_java(source, wrap_class=False):
+def parse_java(source, wrap_class=False, max_nodes=None):
     try:
         tree = javalang.parse.parse(source)
     except javalang.parser.JavaSyntaxError:
         return None
     if wrap_class:
         tree = get_first_method_node(tree)
-    print(tree)
-    return ASTGenerator(tree).generate_ast()
+    return ASTGenerator(tree, max_nodes).generate_ast()
 
 
 def is_int(string):
@@ -47,16 +60,22 @@ def is_numeric(s):
 
 
 class ASTGenerator:
-    def __init__(self, tree):
+    def __init__(self, tree, max_nodes=None):
         self.tree = tree
         self._nodes = []
+        self.max_nodes = float("inf") if max_nodes is None else max_nodes
 
     def generate_ast(self):
         self._nodes = []
         self.traverse(self.tree)
+        # the nodes generated after the last check of traverse
+        if len(self._nodes) > self.max_nodes:
+            raise TooManyNodesError(self.max_nodes)
         return self._nodes
 
     def traverse(self, node):
+        if len(self._nodes) > self.max_nodes:
+            raise TooManyNodesError(self.max_nodes)
         pos = len(self._nodes)
         json_node = {"id": pos}
         self._nodes.append(json_node)
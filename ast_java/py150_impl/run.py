@@ -0,0 +1,53 @@
+from ast_java.py150_impl import ast_ge
+from ast_common import glob
+from ast_common import pipeline
+
+
+def checked_ast(ast):
+    if ast is None:
+        raise ValueError("invalid syntax")
+    return ast
+
+
+def preload():
+    ast_ge.preload()
+
+
+def parse_file(filename, options):
+    return checked_ast(ast_ge.parse_file(filename, options.get("wrap_class", False), options.get("max_nodes")))
+
+
+def parse_source(source, options):
+    contents = bytes(source).decode("utf-8")
+    return checked_ast(ast_ge.parse_string(contents, options.get("wrap_class", False), options.get("max_nodes")))
+
+
+def process_files(files_pattern, output, options=None):
+    """Process all the files matched with the `files_pattern` and
+    output the results in `output`
+
+    Args:
+        files_pattern: a glob pattern containing java files, or tar and zip
+            archives of them with the `archive_members` option
+        output: the path to a file without extension where to output results
+        options: see `pipeline.process_files`, with `wrap_class` to parse
+            files containing a single method
+    """
+    files = glob.iglob(files_pattern, recursive=True)
+    options = dict(options or {}, generator=ast_ge.__name__)
+    pipeline.process_files(files, output, parse_file, options, parse_source)
+
+
+def process_records(records, out, options=None):
+    """Process the java source records of the JSON lines file `records` and
+    write the results to `out` as they are processed
+
+    Args:
+        records: a binary file such as `sys.stdin.buffer` with a record
+            {"id": ..., "code": ...} per line
+        out: a binary file such as `sys.stdout.buffer` where to write a
+            record {"id": ..., "ast": [...]} per line
+    """
+    options = dict(options or {}, generator=ast_ge.__name__, record_suffix=".java")
+    pipeline.process_records(records, out, parse_file, options, parse_source)
+
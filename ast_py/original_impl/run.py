@@ -1,26 +1,18 @@
 import sys
 import json
 import logging
-from multiprocessing import Queue, Pool, Process
 from ast_py.original_impl import ast_ge
-from ast_py.utils import glob
-from ast_py.utils.queue_item import FailedFileItem, ProcessedFileItem
+from ast_common import glob
+from ast_common import pipeline
 
 
-def process_file_init(queue, options):
-    process_file.queue = queue
-    process_file.options = options
+def parse_file(filename, options):
+    return ast_ge.parse_file(filename, options.get("normalize", False), options.get("max_nodes"))
 
 
-def process_file(filename):
-    logging.debug("processing file %s", filename)
-    try:
-        ast = ast_ge.parse_file(filename, process_file.options.get("normalize", False))
-        item = ProcessedFileItem(filename, ast, process_file.options)
-        process_file.queue.put(item)
-    except Exception as e: # pylint: disable=broad-except
-        logging.debug("failed to parse %s: %s", filename, str(e))
-        process_file.queue.put(FailedFileItem(filename, e))
+def parse_source(source, options):
+    return ast_ge.ASTGenerator(source, normalize=options.get("normalize", False),
+                               max_nodes=options.get("max_nodes")).generate_ast()
 
 
 def process_files(files_pattern, output, options=None):
@@ -28,67 +20,27 @@ def process_files(files_pattern, output, options=None):
     output the results in `output`
 
     Args:
-        files_pattern: a glob pattern containing python files
+        files_pattern: a glob pattern containing python files, or tar and zip
+            archives of them with the `archive_members` option
         output: the path to a file without extension where to output results
     """
-    if options is None:
-        options = {}
-
-    queue = Queue(100)
-
-    files = glob.glob(files_pattern, recursive=True)
-    total_count = len(files)
-    logging.info("starting to parse %s files", total_count)
-
-    write_results_process = Process(target=write_results, args=(queue, output, total_count))
-    write_results_process.start()
-
-    pool = Pool(None, process_file_init, [queue, options])
-    pool.map(process_file, files)
-    pool.close()
-    pool.join()
-    queue.put(None)
-    write_results_process.join()
-    logging.info("successfully processed %s files", queue.get())
-
-
-def write_results(queue, output, total_count):
-    failure_count = 0
-    success_count = 0
-    with open(output + ".json", "w") as asts, \
-         open(output + ".txt", "w") as files, \
-         open(output + "_failed.txt", "w") as failed_files:
-        while True:
-            try:
-                item = queue.get()
-                if not item:
-                    break
-                if item.success:
-                    write_successed_item(item, asts, files)
-                    success_count += 1
-                else:
-                    write_failed_item(item, failed_files)
-                    failure_count += 1
-                current_count = success_count + failure_count
-                if current_count % 1000 == 0:
-                    logging.info("progress: %s/%s", current_count, total_count)
-            except Exception as e: # pylint: disable=broad-except
-                logging.error("failed to write %s: %s", item.filename, e)
-    queue.put(success_count)
-
-
-def write_successed_item(item, asts, files):
-    json.dump(item.ast, asts)
-    asts.write("\n")
-    files.write(item.filename)
-    files.write("\n")
-
-
-def write_failed_item(item, failed_files):
-    failed_files.write(item.filename)
-    failed_files.write("\t")
-    failed_files.write(item.reason)
-    failed_files.write("\n")
+    files = glob.iglob(files_pattern, recursive=True)
+    options = dict(options or {}, generator=ast_ge.__name__)
+    pipeline.process_files(files, output, parse_file, options, parse_source)
+
+
+def process_records(records, out, options=None):
+    """Process the python source records of the JSON lines file `records` and
+    write the results to `out` as they are processed
+
+    Args:
+        records: a binary file such as `sys.stdin.buffer` with a record
+            {"id": ..., "code": ...} per line
+        out: a binary file such as `sys.stdout.buffer` where to write a
+            record {"id": ..., "ast": [...]} per line
+    """
+    options = dict(options or {}, generator=ast_ge.__name__, record_suffix=".py")
+    pipeline.process_records(records, out, parse_file, options, parse_source)
 
 
 def run_parse_file(input, is_nomalized=True):
@@ -116,4 +68,5 @@ def run():
         sys.exit(0 if success else 1)
 
 
-run()
\ No newline at end of file
+if __name__ == "__main__":
+    run()
@@ -4,6 +4,7 @@
 import ast
 
 from ast_py.utils import normalizer
+from ast_common.errors import TooManyNodesError
 
 
 try:
@@ -14,38 +15,44 @@ except NameError:
     decode_utf8 = lambda x: x
 
 
-def parse_file(filename, normalize=False):
+def parse_file(filename, normalize=False, max_nodes=None):
     """Returns the AST nodes of the given file
 
     Args:
         filename: path to a file containing a Python program
         normalize: whether the AST should be normalized or not
+        max_nodes: abort with `TooManyNodesError` past this number of nodes
     """
     with open(filename, "r") as f:
         content = f.read()
-    return parse_string(content, normalize=normalize)
+    return parse_string(content, normalize=normalize, max_nodes=max_nodes)
 
 
-def parse_string(content, normalize=False):
+def parse_string(content, normalize=False, max_nodes=None):
     """Returns the AST nodes of the given string
 
     Args:
         content: string containing a Python program
+        max_nodes: abort with `TooManyNodesError` past this number of nodes
     """
-    return ASTGenerator(content, normalize=normalize).generate_ast()
+    return ASTGenerator(content, normalize=normalize, max_nodes=max_nodes).generate_ast()
 
 
 class ASTGenerator:
-    def __init__(self, content, filename="<unknonwn>", normalize=False):
+    def __init__(self, content, filename="<unknonwn>", normalize=False, max_nodes=None, tree=None):
         self.content = content
-        self.tree = ast.parse(self.content, filename)
+        self.tree = ast.parse(self.content, filename) if tree is None else tree
         if normalize:
             self.tree = normalizer.normalize(self.tree)
         self._nodes = []
+        self.max_nodes = float("inf") if max_nodes is None else max_nodes
 
     def generate_ast(self):
         self._nodes = []
         self.traverse(self.tree)
+        # the nodes generated after the last check of traverse
+        if len(self._nodes) > self.max_nodes:
+            raise TooManyNodesError(self.max_nodes)
         return self._nodes
 
     def gen_identifier(self, identifier, node_type="identifier"):
@@ -75,6 +82,8 @@ class ASTGenerator:
                hasattr(ast, "TryFinally") and isinstance(node, ast.TryFinally)
 
     def traverse(self, node):
+        if len(self._nodes) > self.max_nodes:
+            raise TooManyNodesError(self.max_nodes)
         pos = len(self._nodes)
         json_node = {"id": pos}
         self._nodes.append(json_node)
@@ -0,0 +1,61 @@
+"""Generation of several Python AST variants from a single parse of every
+file, see the `variants` option of `pipeline.process_files`.
+"""
+
+import ast
+from ast_py.original_impl import ast_ge as original_ge
+from ast_py.fine_impl import ast_ge as fine_ge
+from ast_py.coarse_impl import ast_ge as coarse_ge
+from ast_py.py150_impl import ast_ge as py150_ge
+from ast_py.utils import normalizer
+from ast_common import glob
+from ast_common import pipeline
+
+
+GENERATORS = {"original": original_ge, "fine": fine_ge, "coarse": coarse_ge, "150": py150_ge}
+
+
+def generate_asts(content, options):
+    """Returns the AST nodes of `content` for every variant of
+    `options`["variants"], or the exception raised by its generator"""
+    tree = ast.parse(content, "<unknonwn>")
+    if options.get("normalize", False):
+        tree = normalizer.normalize(tree)
+    asts = []
+    for variant in options["variants"]:
+        try:
+            generator = GENERATORS[variant].ASTGenerator(content, max_nodes=options.get("max_nodes"), tree=tree)
+            asts.append(generator.generate_ast())
+        except Exception as e:  # pylint: disable=broad-except
+            asts.append(e)
+    return asts
+
+
+def parse_file(filename, options):
+    with open(filename, "r") as f:
+        content = f.read()
+    return generate_asts(content, options)
+
+
+def parse_source(source, options):
+    return generate_asts(source, options)
+
+
+def process_files(files_pattern, output, variants, options=None):
+    """Process all the files matched with the `files_pattern` with all the
+    `variants` at once and output the results of every variant in
+    `output`_`variant`
+
+    Args:
+        files_pattern: a glob pattern containing python files, or tar and zip
+            archives of them with the `archive_members` option
+        output: the path to a file without extension where to output results
+        variants: names of variants among "original", "fine", "coarse"
+            and "150"
+    """
+    unknown = set(variants) - set(GENERATORS)
+    if unknown:
+        raise ValueError("unknown python variants: {0}".format(", ".join(sorted(unknown))))
+    files = glob.iglob(files_pattern, recursive=True)
+    options = dict(options or {}, generator=__name__, variants=list(variants))
+    pipeline.process_files(files, output, parse_file, options, parse_source)
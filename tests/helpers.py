@@ -0,0 +1,54 @@
+"""Generator and files shared by the pipeline tests"""
+
+import json
+import os
+import time
+
+
+def parse_file(filename, options):
+    """Returns an AST of 3 nodes holding the content of `filename`, unless
+    the content asks to crash, hang, be slow or be invalid, "located" raising
+    an error that names the parsed file"""
+    with open(filename) as f:
+        content = f.read()
+    if options.get("calls"):
+        with open(options["calls"], "a") as f:
+            f.write(os.path.basename(filename) + "\n")
+    if content == "crash":
+        os._exit(3)
+    if content == "hang":
+        time.sleep(60)
+    if content == "slow":
+        time.sleep(0.02)
+        content = os.path.basename(filename)
+    if content == "invalid":
+        raise ValueError("invalid syntax")
+    if content == "located":
+        raise ValueError("{0}:1:11: before: located".format(filename))
+    return [{"id": i, "type": "Token", "value": content} for i in range(3)]
+
+
+def make_files(directory, contents):
+    paths = []
+    for name, content in contents:
+        path = os.path.join(str(directory), name)
+        with open(path, "w") as f:
+            f.write(content)
+        paths.append(path)
+    return paths
+
+
+def read_lines(path):
+    with open(path) as f:
+        return f.read().splitlines()
+
+
+def read_output(output):
+    """Returns the successes of `output` as (path, value) pairs, checking that
+    its .json and .txt files are aligned, and its failed paths"""
+    asts = read_lines(output + ".json")
+    paths = read_lines(output + ".txt")
+    assert len(asts) == len(paths)
+    values = [json.loads(ast)[0]["value"] for ast in asts]
+    failed = [line.split("\t")[0] for line in read_lines(output + "_failed.txt")]
+    return list(zip(paths, values)), failed
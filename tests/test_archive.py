@@ -0,0 +1,69 @@
+import io
+import os
+import tarfile
+import zipfile
+
+from ast_common import pipeline
+from ast_common.archive import SourceFile, UnreadableArchive, expand_archives
+
+from helpers import make_files, parse_file, read_lines, read_output
+
+
+def make_tar(path, members):
+    with tarfile.open(path, "w:gz") as f:
+        for name, content in members:
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            f.addfile(info, io.BytesIO(content))
+    return path
+
+
+def make_zip(path, members):
+    with zipfile.ZipFile(path, "w") as f:
+        for name, content in members:
+            f.writestr(name, content)
+    return path
+
+
+def make_truncated_tar(path):
+    """Makes an archive of a small member followed by a large one, cut in
+    the middle of the large one"""
+    make_tar(path, [("small.src", b"small"), ("large.src", os.urandom(1 << 20))])
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) // 2)
+    return path
+
+
+def test_expand_archives(tmp_path):
+    tar = make_tar(str(tmp_path / "a.tar.gz"), [("dir/x.src", b"x"), ("dir/y.txt", b"y"), ("z.src", b"z")])
+    archive = make_zip(str(tmp_path / "b.zip"), [("w.src", b"w"), ("v.src", b"v")])
+    truncated = make_truncated_tar(str(tmp_path / "c.tar.gz"))
+    plain = make_files(tmp_path, [("d.src", "d")])[0]
+    sources = list(expand_archives([tar, archive, truncated, plain], "*.src"))
+    assert all(isinstance(source, SourceFile) for source in sources[:5])
+    assert [(source.name, source.data) for source in sources[:5]] == [
+        (tar + "!dir/x.src", b"x"),
+        (tar + "!z.src", b"z"),
+        (archive + "!w.src", b"w"),
+        (archive + "!v.src", b"v"),
+        (truncated + "!small.src", b"small"),
+    ]
+    assert isinstance(sources[5], UnreadableArchive)
+    assert sources[5].name == truncated
+    assert sources[6:] == [plain]
+
+
+def test_archive_members_processed_and_errors_named(tmp_path):
+    tar = make_tar(str(tmp_path / "a.tar.gz"), [("x.src", b"x"), ("bad.src", b"located")])
+    archive = make_zip(str(tmp_path / "b.zip"), [("y.src", b"y")])
+    truncated = make_truncated_tar(str(tmp_path / "c.tar.gz"))
+    output = str(tmp_path / "out")
+    pipeline.process_files([tar, archive, truncated], output, parse_file,
+                           {"workers": 2, "archive_members": "*.src"})
+    successes, failed = read_output(output)
+    assert sorted(successes) == [(tar + "!x.src", "x"), (archive + "!y.src", "y"),
+                                 (truncated + "!small.src", "small")]
+    reasons = dict(line.split("\t", 1) for line in read_lines(output + "_failed.txt"))
+    assert sorted(reasons) == sorted([tar + "!bad.src", truncated])
+    assert reasons[tar + "!bad.src"] == tar + "!bad.src:1:11: before: located"
+    assert reasons[truncated].startswith("unreadable archive: ")
@@ -0,0 +1,54 @@
+import hashlib
+import os
+
+from ast_common import pipeline
+from ast_common.cache import ASTCache
+
+from helpers import make_files, parse_file, read_lines, read_output
+
+
+def cache_size(directory):
+    return sum(entry.stat().st_size for subdir in os.scandir(directory) for entry in os.scandir(subdir.path))
+
+
+def test_cache_hit_skips_parse(tmp_path):
+    source_dir = tmp_path / "src"
+    source_dir.mkdir()
+    files = make_files(source_dir, [("a.src", "a"), ("b.src", "b"), ("c.src", "invalid")])
+    calls = str(tmp_path / "calls.txt")
+    options = {"workers": 2, "cache_dir": str(tmp_path / "cache"), "calls": calls}
+    pipeline.process_files(files, str(tmp_path / "first"), parse_file, options)
+    assert sorted(read_lines(calls)) == ["a.src", "b.src", "c.src"]
+    os.remove(calls)
+    # the same sources under other paths, only the failed one parsed again
+    copies = make_files(tmp_path, [("a.src", "a"), ("b.src", "b"), ("c.src", "invalid")])
+    pipeline.process_files(copies, str(tmp_path / "second"), parse_file, options)
+    assert read_lines(calls) == ["c.src"]
+    successes, failed = read_output(str(tmp_path / "second"))
+    assert sorted(successes) == [(copies[0], "a"), (copies[1], "b")]
+    assert failed == [copies[2]]
+
+
+def test_cache_key_changes_with_generator_options(tmp_path):
+    digest = hashlib.sha1(b"source").hexdigest()
+    options = [{"generator": "g"}, {"generator": "g", "normalize": True},
+               {"generator": "g", "wrap_class": True}, {"generator": "other"}]
+    paths = {ASTCache(str(tmp_path), variant, 0).path(digest) for variant in options}
+    assert len(paths) == len(options)
+    # options not changing the ASTs share the entries
+    assert ASTCache(str(tmp_path), {"generator": "g", "workers": 4}, 0).path(digest) == \
+        ASTCache(str(tmp_path), {"generator": "g"}, 0).path(digest)
+
+
+def test_eviction_keeps_cache_under_max_bytes(tmp_path):
+    directory = str(tmp_path / "cache")
+    cache = ASTCache(directory, {"generator": "g"}, 1000)
+    digests = [hashlib.sha1(str(i).encode()).hexdigest() for i in range(50)]
+    for i, digest in enumerate(digests):
+        cache.record(cache.put(digest, 1, b"x" * 100))
+        # distinct modification times, from the oldest to the most recent
+        os.utime(cache.path(digest), (i, i))
+        assert cache_size(directory) <= 1000
+    cached = [digest for digest in digests if cache.get(digest) is not None]
+    assert cached == digests[-len(cached):]
+    assert len(cached) >= 5
@@ -0,0 +1,52 @@
+import pytest
+
+from ast_common.cli import parse_args
+
+
+def parse_error(argv, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        parse_args(argv)
+    assert exit_info.value.code == 2
+    return capsys.readouterr().err
+
+
+def test_single_variant():
+    args = parse_args(["--lang", "py", "--variant", "fine", "--input", "*.py", "--output", "out",
+                       "--workers", "4", "--schedule", "adaptive", "--compression", "gzip"])
+    assert args.generators == {"py": "ast_py.fine_impl.run"}
+    assert args.variants == ["fine"]
+    assert (args.workers, args.schedule, args.compression) == (4, "adaptive", "gzip")
+    assert args.timeout is None and args.ordered is None
+
+
+def test_several_variants_and_languages():
+    args = parse_args(["--lang", "c", "--variant", "fine,coarse", "--input", "*.c", "--output", "out"])
+    assert args.variants == ["fine", "coarse"]
+    args = parse_args(["--lang", "c,py", "--variant", "c=fine,py=150", "--input", "*", "--output", "out"])
+    assert args.generators == {"c": "ast_c.fine_impl.run", "py": "ast_py.py150_impl.py_ast"}
+
+
+def test_jsonl():
+    args = parse_args(["--lang", "py", "--variant", "coarse", "--jsonl", "-"])
+    assert args.jsonl == "-" and args.input is None
+
+
+@pytest.mark.parametrize("argv, error", [
+    (["--schedule", "fastest"], "argument --schedule: invalid choice"),
+    (["--compression", "rar"], "argument --compression: invalid choice"),
+    (["--lang", "py", "--variant", "fine,fine"], "duplicate variants"),
+    (["--lang", "py,py", "--variant", "fine"], "duplicate languages"),
+    (["--lang", "c,py", "--variant", "c=fine,c=coarse,py=fine"], "several variants for a language"),
+    (["--lang", "rust", "--variant", "fine"], "unknown language rust"),
+    (["--lang", "java", "--variant", "fine"], "there is no fine variant for java"),
+    (["--lang", "c,py", "--variant", "fine,coarse"], "several variants can only be produced for a single"),
+])
+def test_invalid_arguments(argv, error, capsys):
+    defaults = ["--lang", "py", "--variant", "fine", "--input", "*.py", "--output", "out"]
+    assert error in parse_error(defaults + argv, capsys)
+
+
+def test_input_and_output_or_jsonl_required(capsys):
+    assert "--input and --output are required" in parse_error(["--lang", "py", "--variant", "fine"], capsys)
+    assert "cannot be combined" in parse_error(["--lang", "py", "--variant", "fine", "--jsonl", "-",
+                                                "--input", "*.py"], capsys)
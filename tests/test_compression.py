@@ -0,0 +1,60 @@
+import gzip
+import json
+import os
+
+import pytest
+
+from ast_common import pipeline
+from ast_common.compression import CODECS, BlockWriter, open_input, open_output
+
+from helpers import make_files, parse_file, read_lines
+
+
+def lines(count):
+    return [("line {0} ".format(i) * (i % 13 + 1) + "\n").encode("utf-8") for i in range(count)]
+
+
+def test_blocks_compressed_in_parallel_read_as_one_stream(tmp_path):
+    path = str(tmp_path / "out.json.gz")
+    data = lines(5000)
+    with BlockWriter(open(path, "wb"), CODECS["gzip"], block_size=4096, threads=4) as f:
+        for line in data:
+            f.write(line)
+    with gzip.open(path, "rb") as f:
+        assert f.read() == b"".join(data)
+
+
+def test_flush_ends_a_complete_stream(tmp_path):
+    path = str(tmp_path / "out.json.gz")
+    data = lines(2000)
+    with BlockWriter(open(path, "wb"), CODECS["gzip"], block_size=1000, threads=2) as f:
+        for line in data[:1000]:
+            f.write(line)
+        f.flush()
+        size = f.tell()
+        for line in data[1000:]:
+            f.write(line)
+    with open(path, "rb") as f:
+        assert gzip.decompress(f.read(size)) == b"".join(data[:1000])
+
+
+@pytest.mark.parametrize("compression", sorted(CODECS))
+def test_open_input_reads_every_codec(tmp_path, compression):
+    path = str(tmp_path / "out.json")
+    data = lines(3000)
+    with open_output(path, "wb", compression) as f:
+        for line in data:
+            f.write(line)
+    assert os.listdir(str(tmp_path)) == ["out.json" + CODECS[compression].suffix]
+    with open_input(path) as f:
+        assert f.read() == b"".join(data)
+
+
+def test_compressed_output_of_a_run(tmp_path):
+    files = make_files(tmp_path, [("{0:03d}.src".format(i), "v{0}".format(i)) for i in range(100)])
+    output = str(tmp_path / "out")
+    pipeline.process_files(files, output, parse_file, {"workers": 2, "compression": "gzip"})
+    with gzip.open(output + ".json.gz", "rt") as f:
+        values = [json.loads(line)[0]["value"] for line in f]
+    paths = read_lines(output + ".txt")
+    assert sorted(zip(paths, values)) == [(path, "v{0}".format(i)) for i, path in enumerate(files)]
@@ -0,0 +1,59 @@
+from ast_common import pipeline
+
+from helpers import make_files, parse_file, read_lines, read_output
+
+
+def test_duplicate_files_processed_once(tmp_path):
+    source_dir = tmp_path / "src"
+    source_dir.mkdir()
+    files = make_files(source_dir, [("a.src", "x"), ("b.src", "x"), ("c.src", "y"),
+                                    ("d.src", "x"), ("e.src", "y"), ("f.src", "z")])
+    output = str(tmp_path / "out")
+    calls = str(tmp_path / "calls.txt")
+    pipeline.process_files(files, output, parse_file, {"workers": 2, "dedup": True, "calls": calls})
+    successes, failed = read_output(output)
+    assert sorted(successes) == [(files[0], "x"), (files[2], "y"), (files[5], "z")]
+    assert failed == []
+    assert sorted(read_lines(calls)) == ["a.src", "c.src", "f.src"]
+    assert read_lines(output + "_duplicates.txt") == [
+        "{0}\t{1}".format(files[1], files[0]),
+        "{0}\t{1}".format(files[3], files[0]),
+        "{0}\t{1}".format(files[4], files[2]),
+    ]
+    assert read_lines(output + "_multiplicity.txt") == [
+        "{0}\t3".format(files[0]),
+        "{0}\t2".format(files[2]),
+    ]
+
+
+def test_identical_asts_written_once(tmp_path):
+    files = make_files(tmp_path, [("a.src", "x"), ("b.src", "y"), ("c.src", "x"),
+                                  ("d.src", "invalid"), ("e.src", "x")])
+    output = str(tmp_path / "out")
+    pipeline.process_files(files, output, parse_file, {"workers": 2, "dedup_asts": True, "ordered": True})
+    successes, failed = read_output(output)
+    assert successes == [(files[0], "x"), (files[1], "y")]
+    assert failed == [files[3]]
+    assert read_lines(output + "_trees.txt") == [
+        "{0}\t0".format(files[0]),
+        "{0}\t1".format(files[1]),
+        "{0}\t0".format(files[2]),
+        "{0}\t0".format(files[4]),
+    ]
+    assert read_lines(output + "_tree_counts.txt") == ["3", "1"]
+
+
+def test_tree_index_points_to_the_ast_of_every_file(tmp_path):
+    files = make_files(tmp_path, [("{0:02d}.src".format(i), "v{0}".format(i % 7)) for i in range(40)])
+    output = str(tmp_path / "out")
+    pipeline.process_files(files, output, parse_file, {"workers": 2, "batch_size": 3, "dedup_asts": True})
+    successes, _ = read_output(output)
+    values = [value for _, value in successes]
+    assert sorted(values) == ["v{0}".format(i) for i in range(7)]
+    trees = [line.split("\t") for line in read_lines(output + "_trees.txt")]
+    assert sorted(path for path, _ in trees) == files
+    for path, tree in trees:
+        assert values[int(tree)] == "v{0}".format(int(path[-6:-4]) % 7)
+    counts = [int(count) for count in read_lines(output + "_tree_counts.txt")]
+    assert counts == [sum(1 for _, tree in trees if int(tree) == i) for i in range(7)]
+    assert sum(counts) == len(files)
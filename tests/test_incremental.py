@@ -0,0 +1,28 @@
+import os
+
+from ast_common import pipeline
+
+from helpers import make_files, parse_file, read_lines, read_output
+
+
+def test_incremental_keeps_replaces_and_drops_records(tmp_path):
+    source_dir = tmp_path / "src"
+    source_dir.mkdir()
+    files = make_files(source_dir, [("a.src", "a1"), ("b.src", "b1"), ("c.src", "c1"),
+                                    ("d.src", "d1"), ("e.src", "invalid")])
+    output = str(tmp_path / "out")
+    options = {"workers": 2, "incremental": True, "calls": str(tmp_path / "calls.txt")}
+    pipeline.process_files(list(files), output, parse_file, options)
+    successes, failed = read_output(output)
+    assert sorted(successes) == [(files[0], "a1"), (files[1], "b1"), (files[2], "c1"), (files[3], "d1")]
+    assert failed == [files[4]]
+
+    os.remove(options["calls"])
+    make_files(source_dir, [("b.src", "b22"), ("d.src", "invalid"), ("e.src", "e1"), ("f.src", "f1")])
+    os.remove(files[2])
+    files = [files[0], files[1], files[3], files[4], str(source_dir / "f.src")]
+    pipeline.process_files(list(files), output, parse_file, options)
+    successes, failed = read_output(output)
+    assert sorted(successes) == [(files[0], "a1"), (files[1], "b22"), (files[3], "e1"), (files[4], "f1")]
+    assert failed == [files[2]]
+    assert sorted(read_lines(options["calls"])) == ["b.src", "d.src", "e.src", "f.src"]
@@ -0,0 +1,42 @@
+import io
+import json
+
+from ast_common import pipeline
+
+from helpers import parse_file
+
+
+def run_records(lines):
+    out = io.BytesIO()
+    records = io.BytesIO("".join(line + "\n" for line in lines).encode("utf-8"))
+    pipeline.process_records(records, out, parse_file, {"workers": 2, "record_suffix": ".src"})
+    return [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_ids_copied_as_is():
+    ids = [0, "a", 2.5, None, [1, "b"], {"nested": {"id": 3}}, "0"]
+    results = run_records([json.dumps({"id": id, "code": "v{0}".format(i)}) for i, id in enumerate(ids)])
+    assert len(results) == len(ids)
+    values = {json.dumps(result["id"]): result["ast"][0]["value"] for result in results}
+    assert values == {json.dumps(id): "v{0}".format(i) for i, id in enumerate(ids)}
+
+
+def test_error_records():
+    results = run_records([json.dumps({"id": 1, "code": "invalid"}),
+                           json.dumps({"id": "x", "code": "located"}),
+                           json.dumps({"id": 2, "code": "ok"})])
+    by_id = {json.dumps(result["id"]): result for result in results}
+    assert by_id["1"] == {"id": 1, "error": "invalid syntax"}
+    assert by_id['"x"'] == {"id": "x", "error": 'record "x":1:11: before: located'}
+    assert by_id["2"]["ast"][0]["value"] == "ok"
+
+
+def test_invalid_lines_skipped():
+    results = run_records(["not json",
+                           json.dumps({"id": 1}),
+                           json.dumps({"code": "no id"}),
+                           json.dumps([1, 2]),
+                           "",
+                           json.dumps({"id": 2, "code": "ok"}),
+                           json.dumps({"id": 3, "code": None})])
+    assert results == [{"id": 2, "ast": [{"id": i, "type": "Token", "value": "ok"} for i in range(3)]}]
@@ -0,0 +1,44 @@
+import importlib
+
+import pytest
+
+from ast_common.errors import TooManyNodesError
+
+PY_SOURCE = """def add(a, b):
+    return a + b
+
+
+print(add(1, 2))
+"""
+
+C_SOURCE = """int add(int a, int b) {
+    return a + b;
+}
+"""
+
+
+def check_max_nodes_boundary(parse_file, filename):
+    """Checks that a file of n nodes is generated with a budget of n nodes
+    but rejected with a budget of n - 1"""
+    nodes = parse_file(filename, None)
+    assert parse_file(filename, len(nodes)) == nodes
+    with pytest.raises(TooManyNodesError):
+        parse_file(filename, len(nodes) - 1)
+
+
+@pytest.mark.parametrize("generator", ["original", "fine", "coarse", "py150"])
+def test_python_max_nodes_boundary(tmp_path, generator):
+    ast_ge = importlib.import_module("ast_py.{0}_impl.ast_ge".format(generator))
+    source = tmp_path / "source.py"
+    source.write_text(PY_SOURCE)
+    check_max_nodes_boundary(lambda filename, max_nodes: ast_ge.parse_file(filename, max_nodes=max_nodes),
+                             str(source))
+
+
+@pytest.mark.parametrize("generator", ["original", "fine", "coarse", "c150"])
+def test_c_max_nodes_boundary(tmp_path, generator):
+    pytest.importorskip("pycparser")
+    ast_ge = importlib.import_module("ast_c.{0}_impl.ast_ge".format(generator))
+    source = tmp_path / "source.c"
+    source.write_text(C_SOURCE)
+    check_max_nodes_boundary(ast_ge.parse_file, str(source))
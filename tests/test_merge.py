@@ -0,0 +1,38 @@
+from ast_common import pipeline
+from ast_common.merge import merge_outputs
+
+from helpers import make_files, parse_file, read_output
+
+
+def test_merge_of_partitions_sorted_and_deduplicated(tmp_path):
+    contents = [("{0:03d}.src".format(i), "invalid" if i % 5 == 0 else "v{0}".format(i)) for i in range(50)]
+    files = make_files(tmp_path, contents)
+    whole = str(tmp_path / "whole")
+    pipeline.process_files(files, whole, parse_file, {"workers": 2, "checkpoint_interval": 0})
+    parts = []
+    for index in range(3):
+        part = str(tmp_path / "part{0}".format(index))
+        pipeline.process_files(files, part, parse_file,
+                               {"workers": 2, "checkpoint_interval": 0, "partition": "{0}/3".format(index)})
+        parts.append(part)
+    merged = str(tmp_path / "merged")
+    # a tiny memory budget spills sorted runs to disk, a part merged twice
+    # is deduplicated
+    merge_outputs(merged, parts + parts[:1], sort=True, dedup=True, max_memory=0.0001)
+    successes, failed = read_output(merged)
+    expected, expected_failed = read_output(whole)
+    assert successes == sorted(expected)
+    assert failed == sorted(expected_failed)
+
+
+def test_merge_of_shards_from_another_directory(tmp_path, monkeypatch):
+    files = make_files(tmp_path, [("{0:03d}.src".format(i), "v{0}".format(i)) for i in range(40)])
+    (tmp_path / "out").mkdir()
+    monkeypatch.chdir(tmp_path)
+    pipeline.process_files(files, "out/sharded", parse_file, {"workers": 2, "shards": 3})
+    monkeypatch.chdir("/")
+    merged = str(tmp_path / "merged")
+    merge_outputs(merged, [str(tmp_path / "out" / "sharded")], sort=True)
+    successes, failed = read_output(merged)
+    assert successes == [(path, "v{0}".format(i)) for i, path in enumerate(files)]
+    assert failed == []
@@ -0,0 +1,19 @@
+from ast_common import pipeline
+
+from helpers import make_files, parse_file, read_output
+
+
+def test_ordered_output_survives_killed_workers(tmp_path):
+    contents = [("{0:03d}.src".format(i), "v{0}".format(i)) for i in range(20)]
+    contents[3] = ("003.src", "crash")
+    contents[7] = ("007.src", "hang")
+    files = make_files(tmp_path, contents)
+    output = str(tmp_path / "out")
+    pipeline.process_files(files, output, parse_file,
+                           {"workers": 2, "batch_size": 2, "ordered": True, "timeout": 1,
+                            "checkpoint_interval": 0})
+    successes, failed = read_output(output)
+    expected = [(path, content) for path, (_, content) in zip(files, contents)
+                if content not in ("crash", "hang")]
+    assert successes == expected
+    assert sorted(failed) == [files[3], files[7]]
@@ -0,0 +1,25 @@
+from ast_common import pipeline
+from ast_common.pack import write_pack
+
+from helpers import make_files, parse_file
+
+
+def read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_packed_and_unpacked_runs_identical(tmp_path):
+    source_dir = tmp_path / "src"
+    source_dir.mkdir()
+    contents = [("{0:03d}.src".format(i), "v{0}".format(i) * (i % 5)) for i in range(60)]
+    contents += [("invalid.src", "invalid"), ("located.src", "located")]
+    files = make_files(source_dir, contents)
+    pack = str(tmp_path / "sources.pack")
+    assert write_pack(files, pack) == len(files)
+    options = {"workers": 2, "ordered": True}
+    pipeline.process_files(files, str(tmp_path / "unpacked"), parse_file, options)
+    pipeline.process_files([pack], str(tmp_path / "packed"), parse_file, options)
+    for suffix in (".json", ".txt", "_failed.txt"):
+        assert read_bytes(str(tmp_path / "packed") + suffix) == read_bytes(str(tmp_path / "unpacked") + suffix)
+    assert read_bytes(str(tmp_path / "packed") + "_failed.txt").count(b"\n") == 2
@@ -0,0 +1,25 @@
+import pytest
+
+from ast_common import pipeline
+
+from helpers import make_files, parse_file, read_output
+
+
+def test_partitions_are_disjoint_and_cover_all_the_files(tmp_path):
+    files = make_files(tmp_path, [("{0:03d}.src".format(i), "v{0}".format(i)) for i in range(60)])
+    partitions = []
+    for index in range(4):
+        output = str(tmp_path / "part{0}".format(index))
+        pipeline.process_files(files, output, parse_file,
+                               {"workers": 1, "checkpoint_interval": 0, "partition": "{0}/4".format(index)})
+        partitions.append([path for path, _ in read_output(output)[0]])
+    assert sorted(path for partition in partitions for path in partition) == files
+    assert all(partitions)
+    # the partition of a file only depends on its path
+    assert list(pipeline.partition_files(files, 2, 4)) == [path for path in files if path in partitions[2]]
+
+
+@pytest.mark.parametrize("partition", ["4/4", "-1/4", "1", "a/b", "0/0"])
+def test_invalid_partition(partition):
+    with pytest.raises(ValueError):
+        pipeline.parse_partition(partition)
@@ -0,0 +1,110 @@
+import collections
+import os
+import signal
+import time
+
+import pytest
+
+from ast_common.pool import WorkerInitError, WorkerPool
+
+
+def run_task(task):
+    if task == "crash":
+        os._exit(3)
+    if task == "hang":
+        time.sleep(60)
+    if task == "pid":
+        return ("ok", task, os.getpid())
+    return ("ok", task)
+
+
+def failed_task(task, reason):
+    return ("failed", task, reason)
+
+
+def run_pool(chunks, **kwargs):
+    pool = WorkerPool(run_task, 2, failed_result=failed_task, **kwargs)
+    results = [result for results in pool.imap_unordered(chunks) for result in results]
+    return pool, results
+
+
+def test_results_of_every_task():
+    pool, results = run_pool([[1, 2, 3], [4, 5], [6]])
+    assert sorted(results) == [("ok", task) for task in range(1, 7)]
+    assert pool.crash_count == 0
+    assert pool.timeout_count == 0
+
+
+def test_crashed_task_recorded_once_and_rest_of_chunk_retried():
+    pool, results = run_pool([[1, 2, "crash", 4], [5, 6]])
+    tasks = collections.Counter(result[1] for result in results)
+    assert tasks == collections.Counter([1, 2, "crash", 4, 5, 6])
+    failed = [result for result in results if result[0] == "failed"]
+    assert failed == [("failed", "crash", "worker exited with code 3")]
+    assert pool.crash_count == 1
+
+
+def test_timed_out_task_recorded_once_and_rest_of_chunk_retried():
+    started = time.monotonic()
+    pool, results = run_pool([[1, "hang", 3], [4, 5, 6]], timeout=1)
+    assert time.monotonic() - started < 30
+    tasks = collections.Counter(result[1] for result in results)
+    assert tasks == collections.Counter([1, "hang", 3, 4, 5, 6])
+    failed = [result for result in results if result[0] == "failed"]
+    assert failed == [("failed", "hang", "timeout")]
+    assert pool.timeout_count == 1
+
+
+def test_crash_and_timeout_in_the_same_run():
+    pool, results = run_pool([["crash", 1], [2, "hang"], [3, 4]], timeout=1)
+    assert sorted(str(result[1]) for result in results) == ["1", "2", "3", "4", "crash", "hang"]
+    assert pool.crash_count == 1
+    assert pool.timeout_count == 1
+
+
+def test_recycled_workers():
+    pool, results = run_pool([[task] for task in range(8)], max_tasks=2)
+    assert sorted(results) == [("ok", task) for task in range(8)]
+    assert pool.recycle_counts["tasks"] >= 3
+
+
+def test_workers_recycled_past_memory_ceiling():
+    pool, results = run_pool([[task] for task in range(4)], max_memory=1)
+    assert sorted(results) == [("ok", task) for task in range(4)]
+    assert pool.recycle_counts["memory"] == 4
+
+
+def failing_initializer():
+    raise ImportError("No module named 'parser'")
+
+
+def test_failing_initializer_raises_instead_of_respawning():
+    pool = WorkerPool(run_task, 2, initializer=failing_initializer, failed_result=failed_task)
+    with pytest.raises(WorkerInitError, match="No module named 'parser'"):
+        list(pool.imap_unordered([[1], [2], [3]]))
+    assert pool.crash_count == 0
+
+
+def wait_reaped(pid):
+    """Waits until the worker `pid` is killed and reaped by the fork server"""
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return
+        time.sleep(0.01)
+
+
+def test_worker_killed_while_idle():
+    pool = WorkerPool(run_task, 1, failed_result=failed_task)
+    results = []
+    for chunk_results in pool.imap_unordered([["pid"], [2, 3]]):
+        if not results:
+            # the only worker is idle until the next chunk is dispatched
+            pid = chunk_results[0][2]
+            os.kill(pid, signal.SIGKILL)
+            wait_reaped(pid)
+        results.extend(chunk_results)
+    assert results[1:] == [("failed", 2, "worker exited with code -9"), ("ok", 3)]
+    assert pool.crash_count == 1
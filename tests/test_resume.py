@@ -0,0 +1,64 @@
+import os
+import signal
+import time
+
+import pytest
+
+from ast_common import pipeline
+from ast_common.pool import context
+from ast_common.writer import ResultWriter, resume_outputs
+
+from helpers import make_files, parse_file, read_lines, read_output
+
+
+def run_slowly(files, output):
+    pipeline.process_files(files, output, parse_file, {"workers": 2, "checkpoint_interval": 0.1})
+
+
+def test_resume_after_sigkill(tmp_path):
+    names = ["{0:04d}.src".format(i) for i in range(300)]
+    files = make_files(tmp_path, [(name, "slow") for name in names])
+    output = str(tmp_path / "out")
+    process = context.Process(target=run_slowly, args=(files, output))
+    process.start()
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if os.path.exists(output + ".checkpoint") and len(read_lines(output + ".txt")) > 20:
+            break
+        time.sleep(0.05)
+    os.kill(process.pid, signal.SIGKILL)
+    process.join()
+    interrupted = len(read_lines(output + ".txt"))
+    assert 0 < interrupted < len(files)
+
+    pipeline.process_files(files, output, parse_file, {"workers": 2, "resume": True, "checkpoint_interval": 0.1})
+    successes, failed = read_output(output)
+    assert failed == []
+    assert sorted(path for path, _ in successes) == files
+    assert all(os.path.basename(path) == value for path, value in successes)
+
+
+def test_new_run_replaces_the_checkpoint_of_a_previous_run(tmp_path):
+    files = make_files(tmp_path, [("{0:02d}.src".format(i), "v{0}".format(i)) for i in range(30)])
+    output = str(tmp_path / "out")
+    pipeline.process_files(files, output, parse_file, {"workers": 1, "checkpoint_interval": 60})
+    assert os.path.exists(output + ".checkpoint")
+    # a new run dying before its first periodic checkpoint
+    writer = ResultWriter(output, None, checkpoint_interval=60)
+    writer.__enter__()
+    writer.files.write(b"g0\n")
+    writer.files.flush()
+    assert resume_outputs(output) == set()
+    assert read_lines(output + ".txt") == []
+    for f in (writer.asts, writer.files, writer.failed_files):
+        f.close()
+
+
+def test_resume_refuses_a_checkpoint_larger_than_the_outputs(tmp_path):
+    files = make_files(tmp_path, [("{0:02d}.src".format(i), "v{0}".format(i)) for i in range(30)])
+    output = str(tmp_path / "out")
+    pipeline.process_files(files, output, parse_file, {"workers": 1, "checkpoint_interval": 60})
+    with open(output + ".txt", "wb") as f:
+        f.write(b"g0\n")
+    with pytest.raises(ValueError):
+        resume_outputs(output)
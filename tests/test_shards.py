@@ -0,0 +1,22 @@
+import pytest
+
+from ast_common import pipeline
+from ast_common.shards import ShardWriterError
+
+from helpers import make_files, parse_file
+
+
+def test_missing_output_directory_fails_before_the_run(tmp_path):
+    files = make_files(tmp_path, [("a.src", "a")])
+    with pytest.raises(FileNotFoundError, match="no such output directory"):
+        pipeline.process_files(files, str(tmp_path / "missing" / "out"), parse_file,
+                               {"workers": 1, "shards": 2})
+
+
+def test_error_of_a_shard_writer_reported(tmp_path):
+    files = make_files(tmp_path, [("{0:03d}.src".format(i), "v{0}".format(i)) for i in range(20)])
+    # the json output of the second shard cannot be opened
+    (tmp_path / "out-00001.json").mkdir()
+    with pytest.raises(ShardWriterError, match="writer of shard 1 failed: IsADirectoryError"):
+        pipeline.process_files(files, str(tmp_path / "out"), parse_file,
+                               {"workers": 1, "shards": 2})
@@ -0,0 +1,47 @@
+import os
+
+import pytest
+
+from ast_py import variants
+from ast_py.coarse_impl import run as coarse_run
+from ast_py.fine_impl import run as fine_run
+from ast_py.original_impl import run as original_run
+from ast_py.py150_impl import py_ast
+
+from helpers import make_files
+
+SINGLE_VARIANTS = {"original": original_run, "fine": fine_run, "coarse": coarse_run, "150": py_ast}
+
+SOURCES = [
+    ("a.py", "x = 1\n"),
+    ("b.py", "def f(a, b=2, *args, **kwargs):\n    return [i * a for i in args if i]\n"),
+    ("c.py", "class C(object):\n    def m(self):\n        try:\n            pass\n"
+             "        except ValueError as e:\n            raise\n        finally:\n            return self\n"),
+    ("d.py", "import os\nwith open(os.devnull) as f:\n    print({k: v for k, v in enumerate(f)})\n"),
+    ("e.py", "def broken(:\n"),
+    ("f.py", "".join("y{0} = y{0} + {0}\n".format(i) for i in range(40))),
+]
+
+
+def read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("normalize", [False, True])
+def test_multi_variant_output_identical_to_single_variant_runs(tmp_path, normalize):
+    source_dir = tmp_path / "src"
+    source_dir.mkdir()
+    make_files(source_dir, SOURCES)
+    pattern = str(source_dir / "*.py")
+    # c.py and d.py exceed the budget of the original and 150 variants only,
+    # f.py the budget of every variant
+    options = {"workers": 2, "ordered": True, "max_nodes": 20, "normalize": normalize}
+    variants.process_files(pattern, str(tmp_path / "multi"), list(SINGLE_VARIANTS), options)
+    for variant, module in SINGLE_VARIANTS.items():
+        single = str(tmp_path / "single_{0}".format(variant))
+        module.process_files(pattern, single, options)
+        multi = str(tmp_path / "multi_{0}".format(variant))
+        for suffix in (".json", ".txt", "_failed.txt"):
+            assert read_bytes(multi + suffix) == read_bytes(single + suffix), (variant, suffix)
+        assert os.path.getsize(single + ".txt") > 0